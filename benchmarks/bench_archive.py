@@ -0,0 +1,84 @@
+"""Benchmark: heißer Speicher (patients.json) vs. kaltes Archiv.
+
+Erzeugt synthetische Patienten, archiviert den Anteil mit abgeschlossenem
+Lauf und misst Dateigrößen sowie Ladezeiten.
+
+Aufruf aus dem Projektverzeichnis:
+
+    python -m benchmarks.bench_archive [ANZAHL_PATIENTEN] [MESSUNGEN_PRO_PATIENT] [ANTEIL_ABGESCHLOSSEN]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_records import _best_of, make_patients
+from utils import archive, storage
+from utils.records import Patient
+
+
+def main():
+    n_patients = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_measurements = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    closed_share = float(sys.argv[3]) if len(sys.argv) > 3 else 0.8
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        storage.DATA_DIR = tmp
+        patient_file = tmp / storage.PATIENT_FILE
+
+        patients = {pid: Patient.from_dict(p, pid) for pid, p in make_patients(n_patients, n_measurements).items()}
+        for i, p in enumerate(patients.values()):
+            if i < n_patients * closed_share:
+                p.explantiert = "2025-01-10"
+
+        storage.save_patients(patients)
+        size_before = patient_file.stat().st_size
+        t_load_before = _best_of(storage.load_patients)
+        t_save_before = _best_of(lambda: storage.save_patients(patients))
+
+        t0 = time.perf_counter()
+        archived = archive.archive_closed(patients)
+        storage.save_patients(patients)
+        t_archive = time.perf_counter() - t0
+
+        size_after = patient_file.stat().st_size
+        size_cold = sum(p.stat().st_size for p in archive.archive_dir().iterdir())
+        t_load_after = _best_of(storage.load_patients)
+        t_save_after = _best_of(lambda: storage.save_patients(patients))
+
+        stub_id = archived[len(archived) // 2]
+        stub = patients[stub_id]
+
+        def cold_single():
+            archive._read_segment.cache_clear()
+            archive.load_archived(stub_id, stub)
+
+        t_cold_single = _best_of(cold_single)
+        t_cached_single = _best_of(lambda: archive.load_archived(stub_id, stub))
+
+        def cold_bulk():
+            archive._read_segment.cache_clear()
+            archive.with_archived(patients)
+
+        t_bulk_cold = _best_of(cold_bulk, repeat=3)
+        # nur aussagekräftig, solange alle Segmente in den Cache passen
+        t_bulk_cached = _best_of(lambda: archive.with_archived(patients), repeat=3)
+        n_segments = len({p.archiv["segment"] for p in patients.values() if p.archiv is not None})
+
+        codec = "zstd" if archive.zstandard is not None else "gzip"
+        print(f"{n_patients} Patienten × {n_measurements} Messungen, {len(archived)} archiviert ({codec})")
+        print(f"patients.json vorher:   {size_before / 1e6:7.2f} MB   laden {t_load_before * 1000:7.1f} ms"
+              f"   speichern {t_save_before * 1000:7.1f} ms")
+        print(f"patients.json nachher:  {size_after / 1e6:7.2f} MB   laden {t_load_after * 1000:7.1f} ms"
+              f"   speichern {t_save_after * 1000:7.1f} ms")
+        print(f"Archivsegmente:         {size_cold / 1e6:7.2f} MB   (Archivieren einmalig {t_archive * 1000:.0f} ms)")
+        print(f"Einzelzugriff kalt:     {t_cold_single * 1000:7.1f} ms   (Segment entpacken)")
+        print(f"Einzelzugriff Cache:    {t_cached_single * 1000:7.1f} ms")
+        print(f"Kohorte komplett kalt:  {t_bulk_cold * 1000:7.1f} ms   (aktiv + archiviert, alle Segmente entpacken)")
+        print(f"Kohorte komplett Cache: {t_bulk_cached * 1000:7.1f} ms   "
+              f"({n_segments} Segmente, Cache fasst {archive._read_segment.cache_info().maxsize})")
+
+
+if __name__ == "__main__":
+    main()
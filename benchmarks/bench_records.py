@@ -0,0 +1,106 @@
+"""Benchmark: Dekodieren/Kodieren der Patientendaten.
+
+Vergleicht den bisherigen Weg (``json.loads`` in untypisierte Dicts) mit
+den validierten Datensätzen aus ``utils.records`` (``from_dict`` /
+``to_dict``). Beide Seiten verarbeiten denselben kompakten JSON-Text, damit
+nur der Aufwand der Datensätze gemessen wird. Der Größenunterschied durch
+das kompakte Format (früher ``indent=2``) wird getrennt ausgegeben.
+
+Aufruf aus dem Projektverzeichnis:
+
+    python -m benchmarks.bench_records [ANZAHL_PATIENTEN] [MESSUNGEN_PRO_PATIENT]
+"""
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from utils.records import Patient
+
+
+def make_patients(n_patients: int, n_measurements: int) -> dict:
+    rnd = random.Random(42)
+    start = datetime(2025, 1, 1)
+    patients = {}
+    for i in range(n_patients):
+        verlauf = []
+        for j in range(n_measurements):
+            verlauf.append({
+                "timestamp": (start + timedelta(hours=j)).isoformat(timespec="seconds"),
+                "MAP": round(rnd.uniform(50, 90), 1),
+                "HR": round(rnd.uniform(60, 130), 1),
+                "Vasopressor": round(rnd.uniform(0, 10), 1),
+                "ECMO_Flow": round(rnd.uniform(1.5, 4.5), 1),
+                "Sweep": round(rnd.uniform(1, 5), 1),
+                "ECMO_FiO2": round(rnd.uniform(0.21, 1), 2),
+                "Vent_FiO2": round(rnd.uniform(0.21, 1), 2),
+                "PEEP": round(rnd.uniform(5, 15), 1),
+                "DP": round(rnd.uniform(8, 20), 1),
+                "Laktat": round(rnd.uniform(0.5, 8), 1),
+                "pH": round(rnd.uniform(7.1, 7.5), 2),
+                "PaO2": round(rnd.uniform(50, 200), 1),
+                "Organ": round(rnd.uniform(0, 10), 1),
+                "Echo": round(rnd.uniform(0, 10), 1),
+                "score": round(rnd.uniform(0, 100), 1),
+            })
+        patients[f"ECMO-{i:05d}"] = {
+            "name": f"Fall {i}",
+            "age": rnd.randint(18, 90),
+            "diagnose": "VA-ECMO",
+            "verlauf": verlauf,
+        }
+    return patients
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    n_patients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_measurements = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    raw = make_patients(n_patients, n_measurements)
+    text = json.dumps(raw, ensure_ascii=False, separators=(",", ":"))
+    indented_size = len(json.dumps(raw, indent=2, ensure_ascii=False))
+    records = {pid: Patient.from_dict(p, pid) for pid, p in raw.items()}
+    n_meas = n_patients * n_measurements
+
+    def old_decode():
+        json.loads(text)
+
+    def new_decode():
+        {pid: Patient.from_dict(p, pid) for pid, p in json.loads(text).items()}
+
+    def old_encode():
+        json.dumps(raw, ensure_ascii=False, separators=(",", ":"))
+
+    def new_encode():
+        json.dumps(
+            {pid: p.to_dict() for pid, p in records.items()},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    print(f"{n_patients} Patienten × {n_measurements} Messungen = {n_meas} Messungen")
+    print(f"Dateigröße (nur Format): indent=2 {indented_size / 1e6:.2f} MB, "
+          f"kompakt {len(text) / 1e6:.2f} MB")
+    timings = {}
+    for label, fn in [
+        ("Dekodieren alt (json.loads, ungeprüft)", old_decode),
+        ("Dekodieren neu (json.loads + Validierung)", new_decode),
+        ("Kodieren alt (json.dumps)", old_encode),
+        ("Kodieren neu (to_dict + json.dumps)", new_encode),
+    ]:
+        t = timings[fn] = _best_of(fn)
+        print(f"{label:45s} {t * 1000:8.1f} ms  {n_meas / t / 1e3:8.0f} k Messungen/s")
+    print(f"Mehraufwand Validierung beim Dekodieren: "
+          f"{(timings[new_decode] / timings[old_decode] - 1) * 100:+.0f} %")
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,21 @@
 import streamlit as st
 from pathlib import Path
-import json
 from datetime import date
 import pandas as pd
 
-
-# ---------------------------------------
-# Speicherort für die Studiendaten
-# ---------------------------------------
-STUDY_FILE = Path("data") / "study_30cerw_cases.json"
-
-
-def load_cases() -> dict:
-    """Bestehende Fälle aus JSON laden."""
-    if not STUDY_FILE.exists():
-        return {}
-    try:
-        with open(STUDY_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, dict):
-                return data
-            return {}
-    except Exception:
-        return {}
-
-
-def save_cases(cases: dict):
-    """Fälle in JSON-Datei speichern."""
-    STUDY_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(STUDY_FILE, "w", encoding="utf-8") as f:
-        json.dump(cases, f, indent=2, ensure_ascii=False)
-
+from utils.records import (
+    DAUER_BEATMUNG,
+    DAUER_REA,
+    GESCHLECHT,
+    HAUPTDIAGNOSE,
+    JA_NEIN,
+    URSACHE,
+    StudyCase,
+    choices,
+)
+from utils import audit, derived
+from utils.merge import field_diff
+from utils.storage import StorageError, load_cases, save_cases, use_partition
 
 # ---------------------------------------
 # Sidebar: Logo wie in den anderen Seiten
@@ -40,9 +25,14 @@ with st.sidebar:
     LOGO_PATH = Path(__file__).parent.parent / "logo" / "logo_main.png"
     if LOGO_PATH.exists():
         st.image(str(LOGO_PATH), width=160)
+    if st.session_state.get("zentrum"):
+        st.caption(f"Zentrum: **{st.session_state['zentrum']}**")
     st.markdown("<br>", unsafe_allow_html=True)
 
 
+# Daten des angemeldeten Zentrums (ohne Login: gemeinsamer Bestand)
+use_partition(st.session_state.get("zentrum"))
+
 # ---------------------------------------
 # Seite: Datenerhebungsbogen 30CERW
 # ---------------------------------------
@@ -54,7 +44,13 @@ st.info(
     "Bitte **keine Klarnamen** und keine direkt identifizierenden Daten eingeben."
 )
 
-cases = load_cases()
+try:
+    cases = load_cases()
+except StorageError as e:
+    st.error(f"Studiendaten konnten nicht gelesen werden: {e}")
+    st.stop()
+
+audit.ensure_baseline("case", cases)
 
 st.markdown("## Allgemeine Studienangaben")
 
@@ -68,7 +64,7 @@ with col3:
 
 col4, col5, col6 = st.columns(3)
 with col4:
-    sex = st.selectbox("Geschlecht", ["-", "w", "m", "divers"])
+    sex = st.selectbox("Geschlecht", choices(GESCHLECHT))
 with col5:
     age = st.number_input("Alter [Jahre]", min_value=0, max_value=120, value=60)
 with col6:
@@ -78,27 +74,29 @@ col7, col8 = st.columns(2)
 with col7:
     weight_kg = st.number_input("Körpergewicht [kg]", min_value=30.0, max_value=250.0, value=80.0, step=0.5)
 with col8:
-    bmi = st.number_input("BMI", min_value=10.0, max_value=80.0, value=26.0, step=0.1)
+    # BMI wird aus Größe und Gewicht abgeleitet (utils/derived.py)
+    bmi = derived.bmi(height_cm, weight_kg)
+    st.metric("BMI (berechnet)", f"{bmi:.1f}")
 
 
 st.markdown("## Reanimation")
 
 col9, col10, col11 = st.columns(3)
 with col9:
-    cpr = st.selectbox("Reanimation vor ECMO", ["-", "ja", "nein"])
+    cpr = st.selectbox("Reanimation vor ECMO", choices(JA_NEIN))
 with col10:
-    cpr_duration = st.selectbox("Falls ja: Dauer", ["-", "< 30 min", "> 30 min"])
+    cpr_duration = st.selectbox("Falls ja: Dauer", choices(DAUER_REA))
 with col11:
-    ecpr = st.selectbox("ECPR", ["-", "ja", "nein"])
+    ecpr = st.selectbox("ECPR", choices(JA_NEIN))
 
 
 st.markdown("## Beatmung / Intensivaufenthalt (präimplantativ)")
 
 col12, col13, col14 = st.columns(3)
 with col12:
-    mech_vent_pre = st.selectbox("Mechanische Beatmung prä-ECMO", ["-", "ja", "nein"])
+    mech_vent_pre = st.selectbox("Mechanische Beatmung prä-ECMO", choices(JA_NEIN))
 with col13:
-    vent_duration_cat = st.selectbox("Beatmungsdauer", ["-", "< 7 Tage", "> 7 Tage"])
+    vent_duration_cat = st.selectbox("Beatmungsdauer", choices(DAUER_BEATMUNG))
 with col14:
     icu_days_pre = st.number_input("ICU-Aufenthalt prä-ECMO [Tage]", min_value=0, max_value=365, value=0)
 
@@ -107,28 +105,9 @@ st.markdown("## Diagnostische Kategorie")
 
 col15, col16 = st.columns(2)
 with col15:
-    main_diag = st.selectbox(
-        "Hauptdiagnose",
-        [
-            "-",
-            "Kardiogener Schock",
-            "Postkardiotomie Schock",
-            "Gemischter Schock",
-        ],
-    )
+    main_diag = st.selectbox("Hauptdiagnose", choices(HAUPTDIAGNOSE))
 with col16:
-    cause = st.selectbox(
-        "Ursache",
-        [
-            "-",
-            "AMI (STEMI / NSTEMI)",
-            "Dilatative Kardiomyopathie",
-            "Akute Herzinsuffizienz",
-            "Myokarditis",
-            "Post-OP",
-            "Sonstiges",
-        ],
-    )
+    cause = st.selectbox("Ursache", choices(URSACHE))
 
 other_cause = st.text_input("Falls 'Sonstiges': kurze Beschreibung", value="")
 
@@ -136,7 +115,7 @@ other_cause = st.text_input("Falls 'Sonstiges': kurze Beschreibung", value="")
 st.markdown("## Vorerkrankungen")
 
 def yes_no(label: str):
-    return st.selectbox(label, ["-", "ja", "nein"])
+    return st.selectbox(label, choices(JA_NEIN))
 
 col17, col18, col19 = st.columns(3)
 with col17:
@@ -218,59 +197,84 @@ if st.button("📥 Fall speichern"):
     if not study_id.strip():
         st.error("Bitte eine **Studien-ID** angeben – sie ist der Schlüssel für diesen Fall.")
     else:
-        case_data = {
-            "Studien_ID": study_id.strip(),
-            "Zentrum": center.strip(),
-            "Datum_VA_Implantation": va_date.isoformat(),
-            "Geschlecht": sex,
-            "Alter": age,
-            "Koerpergroesse_cm": height_cm,
-            "Koerpergewicht_kg": weight_kg,
-            "BMI": bmi,
+        case_data = StudyCase(
+            Studien_ID=study_id.strip(),
+            Zentrum=center.strip(),
+            Datum_VA_Implantation=va_date.isoformat(),
+            Geschlecht=sex,
+            Alter=age,
+            Koerpergroesse_cm=height_cm,
+            Koerpergewicht_kg=weight_kg,
+            BMI=bmi,
             # Reanimation
-            "Reanimation_vor_ECMO": cpr,
-            "Reanimationsdauer": cpr_duration,
-            "ECPR": ecpr,
+            Reanimation_vor_ECMO=cpr,
+            Reanimationsdauer=cpr_duration,
+            ECPR=ecpr,
             # Beatmung / ICU
-            "Mechanische_Beatmung_prae": mech_vent_pre,
-            "Beatmungsdauer_Kat": vent_duration_cat,
-            "ICU_Aufenthalt_prae_Tage": icu_days_pre,
+            Mechanische_Beatmung_prae=mech_vent_pre,
+            Beatmungsdauer_Kat=vent_duration_cat,
+            ICU_Aufenthalt_prae_Tage=icu_days_pre,
             # Diagnose
-            "Hauptdiagnose": main_diag,
-            "Ursache": cause,
-            "Ursache_sonstiges": other_cause,
+            Hauptdiagnose=main_diag,
+            Ursache=cause,
+            Ursache_sonstiges=other_cause,
             # Vorerkrankungen
-            "COPD": copd,
-            "Chronische_Niereninsuffizienz": cki,
-            "KHK": khk,
-            "Kardiomyopathie": cardiomyopathy,
-            "Lebererkrankungen": liver_disease,
-            "Diabetes_mellitus": diabetes,
-            "Zerebrovaskulaere_Vorerkrankungen": cerebro_vasc,
-            "Weitere_Vorerkrankungen": other_comorbid,
+            COPD=copd,
+            Chronische_Niereninsuffizienz=cki,
+            KHK=khk,
+            Kardiomyopathie=cardiomyopathy,
+            Lebererkrankungen=liver_disease,
+            Diabetes_mellitus=diabetes,
+            Zerebrovaskulaere_Vorerkrankungen=cerebro_vasc,
+            Weitere_Vorerkrankungen=other_comorbid,
             # Labor
-            "pH": ph,
-            "Laktat": lactate,
-            "BE": be,
-            "Kreatinin": creatinine,
-            "Bilirubin": bilirubin,
-            "PaO2_mmHg": pao2,
+            pH=ph,
+            Laktat=lactate,
+            BE=be,
+            Kreatinin=creatinine,
+            Bilirubin=bilirubin,
+            PaO2_mmHg=pao2,
             # Kreislauf
-            "MAP_mmHg": map_mean,
-            "Vasopressor_erforderlich": vasopressor,
-            "Noradrenalin_Aequivalent_g_pro_kgKG_min": norad_eq,
-            "Mechanische_Beatmung_aktuell": mech_vent_status,
+            MAP_mmHg=map_mean,
+            Vasopressor_erforderlich=vasopressor,
+            Noradrenalin_Aequivalent_g_pro_kgKG_min=norad_eq,
+            Mechanische_Beatmung_aktuell=mech_vent_status,
             # Endpunkte
-            "Ueberleben_30Tage": surv_30d,
-            "ECMO_Weaning_erfolgreich": weaning_success,
-            "Datum_ECMO_Explantation": explant_date.isoformat(),
-            "Weaning_Definition_intern": weaning_def,
-        }
-
-        # existierende Fälle laden, aktuellen Fall (nach Studien-ID) setzen
+            Ueberleben_30Tage=surv_30d,
+            ECMO_Weaning_erfolgreich=weaning_success,
+            Datum_ECMO_Explantation=explant_date.isoformat(),
+            Weaning_Definition_intern=weaning_def,
+        )
+        derived.apply_derivations(case_data)
+
+        # aktuellen Fall (nach Studien-ID) setzen – Überschreiben sichtbar machen
+        previous = cases.get(study_id.strip())
+        if previous is not None:
+            changed = field_diff(previous.to_dict(), case_data.to_dict())
+            if changed:
+                st.warning(
+                    "Bestehender Fall wurde überschrieben. Geänderte Felder: "
+                    + ", ".join(changed)
+                )
         cases[study_id.strip()] = case_data
         save_cases(cases)
-        st.success(f"Fall **{study_id}** wurde gespeichert / aktualisiert.")
+        audit.record_change(
+            "case", study_id.strip(),
+            previous.to_dict() if previous is not None else None,
+            case_data.to_dict(),
+            st.session_state.get("user", ""), "30CERW-Score",
+        )
+        st.success(
+            f"Fall **{study_id}** wurde gespeichert / aktualisiert. "
+            f"30CERW-Score: **{case_data.Score_30CERW}** Punkte "
+            f"(Risiko {case_data.Risikokategorie_30CERW})."
+        )
+        if derived.score_is_placeholder():
+            st.warning(
+                "Der 30CERW-Score beruht auf einer **vorläufigen Punktetabelle "
+                "(Platzhalter, nicht validiert)**. Die Gewichte des Studienprotokolls "
+                "werden in `data/score_30cerw.json` hinterlegt."
+            )
 
 
 # ---------------------------------------
@@ -279,7 +283,28 @@ if st.button("📥 Fall speichern"):
 st.markdown("## Bisher erfasste Fälle")
 
 if cases:
-    df = pd.DataFrame.from_dict(cases, orient="index")
+    df = pd.DataFrame.from_dict({sid: c.to_dict() for sid, c in cases.items()}, orient="index")
     st.dataframe(df)
+
+    if st.button("Abgeleitete Felder neu berechnen"):
+        before = {sid: c.to_dict() for sid, c in cases.items()}
+        touched, stats = derived.recompute_store(cases)
+        if touched:
+            save_cases(cases)
+            for sid in touched:
+                audit.record_change(
+                    "case", sid, before[sid], cases[sid].to_dict(),
+                    st.session_state.get("user", ""), "30CERW-Score",
+                )
+            st.success(
+                f"{len(touched)} Fälle mit aktuellen Formelversionen neu berechnet. "
+                + (
+                    "Geänderte Werte: "
+                    + ", ".join(f"{name} ({n} Fälle)" for name, n in stats.items())
+                    if stats else "Keine Werte haben sich geändert."
+                )
+            )
+        else:
+            st.info("Alle abgeleiteten Felder sind aktuell.")
 else:
     st.info("Bisher wurden noch **keine Fälle** erfasst.")
\ No newline at end of file
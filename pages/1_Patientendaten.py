@@ -1,8 +1,12 @@
 import streamlit as st
-import json
-import os
 from pathlib import Path
 
+from datetime import date
+
+from utils import alerts, archive, audit
+from utils.records import Patient
+from utils.storage import StorageError, load_patients, save_patients, use_partition
+
 # Sidebar Logo (perfekt zentriert)
 with st.sidebar:
     st.markdown("<br>", unsafe_allow_html=True)
@@ -11,38 +15,26 @@ with st.sidebar:
     if LOGO_PATH.exists():
         st.image(str(LOGO_PATH), width=160)
 
+    if st.session_state.get("zentrum"):
+        st.caption(f"Zentrum: **{st.session_state['zentrum']}**")
     st.markdown("<br>", unsafe_allow_html=True)
 
-PATIENT_FILE = Path("data") / "patients.json"
-
-# ---------------------------------------------------------
-# Hilfsfunktionen
-# ---------------------------------------------------------
-def load_patients():
-    if not PATIENT_FILE.exists():
-        return {}
-    try:
-        with open(PATIENT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        # Falls aus Versehen eine Liste gespeichert wurde -> in Dict wandeln
-        if isinstance(data, dict):
-            return data
-        else:
-            return {}
-    except json.JSONDecodeError:
-        return {}
-
-def save_patients(data: dict):
-    PATIENT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(PATIENT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+# Daten des angemeldeten Zentrums (ohne Login: gemeinsamer Bestand)
+use_partition(st.session_state.get("zentrum"))
 
 # ---------------------------------------------------------
 # Seite
 # ---------------------------------------------------------
 st.title("Patientendaten")
 
-patients = load_patients()
+try:
+    patients = load_patients()
+except StorageError as e:
+    st.error(f"Patientendaten konnten nicht gelesen werden: {e}")
+    st.stop()
+
+audit.ensure_baseline("patient", patients)
+user = st.session_state.get("user", "")
 
 # Übersicht vorhandener Patienten
 st.subheader("Übersicht vorhandener Patienten")
@@ -50,10 +42,18 @@ if patients:
     table_data = [
         {
             "Patienten-ID": pid,
-            "Name": pdata.get("name", ""),
-            "Alter": pdata.get("age", ""),
-            "Diagnose": pdata.get("diagnose", ""),
-            "Anzahl Messungen": len(pdata.get("verlauf", [])),
+            "Name": pdata.name,
+            "Alter": pdata.age,
+            "Diagnose": pdata.diagnose,
+            "Anzahl Messungen": (
+                pdata.archiv["messungen"] if pdata.archiv is not None else len(pdata.verlauf)
+            ),
+            "Offene Alarme": len(alerts.for_patient(pdata, open_only=True)),
+            "Status": (
+                "archiviert" if pdata.archiv is not None
+                else "explantiert" if pdata.explantiert
+                else "aktiv"
+            ),
         }
         for pid, pdata in patients.items()
     ]
@@ -72,37 +72,113 @@ with col2:
     diagnose = st.text_input("Diagnose / Kommentar", value="VA-ECMO")
     age = st.number_input("Alter", min_value=0, max_value=120, value=60)
 
+col3, col4 = st.columns(2)
+with col3:
+    explanted = st.checkbox("ECMO explantiert (Lauf abgeschlossen)")
+with col4:
+    explant_date = st.date_input("Datum ECMO-Explantation", value=date.today(), disabled=not explanted)
+
 if st.button("Patient speichern"):
     if not pat_id:
         st.error("Bitte eine Patienten-ID eingeben.")
     else:
-        if not isinstance(patients, dict):
-            patients = {}
+        before = patients[pat_id].to_dict() if pat_id in patients else None
 
         if pat_id not in patients:
             # Neuer Patient
-            patients[pat_id] = {
-                "name": name,
-                "age": age,
-                "diagnose": diagnose,
-                "verlauf": []
-            }
+            patients[pat_id] = Patient(name=name, age=age, diagnose=diagnose)
         else:
             # Patient aktualisieren (Verlauf behalten)
-            patients[pat_id]["name"] = name
-            patients[pat_id]["age"] = age
-            patients[pat_id]["diagnose"] = diagnose
+            patients[pat_id].name = name
+            patients[pat_id].age = age
+            patients[pat_id].diagnose = diagnose
+        if patients[pat_id].archiv is None:
+            patients[pat_id].explantiert = explant_date.isoformat() if explanted else None
 
         save_patients(patients)
+        audit.record_change("patient", pat_id, before, patients[pat_id].to_dict(), user, "Patientendaten")
         st.success(f"Patient **{pat_id}** wurde gespeichert.")
 
+# ---------------------------------------------------------
+# Archivierung abgeschlossener ECMO-Läufe
+# ---------------------------------------------------------
+st.markdown("### Archivierung")
+
+closed = archive.closed_patients(patients)
+if closed:
+    st.write(
+        f"{len(closed)} abgeschlossene(r) Lauf/Läufe können archiviert werden: "
+        + ", ".join(closed)
+    )
+    if st.button("Abgeschlossene Läufe archivieren"):
+        before = {pid: patients[pid].to_dict() for pid in closed}
+        archive.archive_closed(patients, closed)
+        save_patients(patients)
+        for pid in closed:
+            audit.record_change("patient", pid, before[pid], patients[pid].to_dict(), user, "Patientendaten")
+        st.success(
+            "Archiviert. Die Verläufe bleiben unter **Verläufe** lesbar, "
+            "werden aber nicht mehr bei jedem Laden mitgelesen."
+        )
+else:
+    st.info("Keine abgeschlossenen, nicht archivierten Läufe vorhanden.")
+
 st.markdown("### Patient löschen")
 
 if patients:
     del_id = st.selectbox("Patient auswählen", list(patients.keys()))
     if st.button("Ausgewählten Patienten löschen"):
-        patients.pop(del_id, None)
+        removed = patients.pop(del_id, None)
         save_patients(patients)
-        st.warning(f"Patient **{del_id}** wurde gelöscht.")
+        if removed is not None:
+            audit.record_change("patient", del_id, removed.to_dict(), None, user, "Patientendaten")
+        st.warning(f"Patient **{del_id}** wurde gelöscht (kann unten wiederhergestellt werden).")
+else:
+    st.info("Zum Löschen muss zuerst ein Patient angelegt werden.")
+
+# ---------------------------------------------------------
+# Änderungsprotokoll
+# ---------------------------------------------------------
+st.markdown("### Gelöschte Patienten wiederherstellen")
+
+deleted = {
+    pid: seq for pid, seq in audit.deleted_objects("patient").items() if pid not in patients
+}
+if deleted:
+    restore_id = st.selectbox("Gelöschter Patient", list(deleted.keys()))
+    if st.button("Löschen rückgängig machen"):
+        state = audit.state_before_delete("patient", restore_id, deleted[restore_id])
+        if state is None:
+            st.error(
+                f"Für Patient **{restore_id}** ist im Änderungsprotokoll kein Stand "
+                "vor dem Löschen vorhanden."
+            )
+        else:
+            patients[restore_id] = Patient.from_dict(state, restore_id)
+            save_patients(patients)
+            audit.record_restore("patient", restore_id, state, user, "Patientendaten")
+            st.success(f"Patient **{restore_id}** wurde wiederhergestellt.")
 else:
-    st.info("Zum Löschen muss zuerst ein Patient angelegt werden.")
\ No newline at end of file
+    st.info("Keine gelöschten Patienten im Änderungsprotokoll.")
+
+if patients:
+    with st.expander("Änderungsverlauf anzeigen"):
+        hist_id = st.selectbox("Patient", list(patients.keys()), key="hist_id")
+        rows = [
+            {
+                "Zeitpunkt": e["ts"],
+                "Benutzer": e["user"],
+                "Seite": e["page"],
+                "Aktion": e["op"],
+                "Geänderte Felder": ", ".join(
+                    list(e["delta"].get("set", {}))
+                    + e["delta"].get("unset", [])
+                    + [f"{k} (+{len(v)})" for k, v in e["delta"].get("append", {}).items()]
+                ),
+            }
+            for e in audit.history("patient", hist_id)
+        ]
+        if rows:
+            st.table(rows)
+        else:
+            st.info("Für diesen Patienten gibt es noch keine Einträge.")
\ No newline at end of file
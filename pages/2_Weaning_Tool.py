@@ -1,8 +1,12 @@
 import streamlit as st
-import json
 from pathlib import Path
 from datetime import datetime
 
+from utils import alerts, audit, uncertainty
+from utils.scoring import calc_weaning_score
+from utils.records import Measurement
+from utils.storage import StorageError, load_patients, save_patients, use_partition
+
 # Sidebar Logo (perfekt zentriert)
 with st.sidebar:
     st.markdown("<br>", unsafe_allow_html=True)
@@ -11,144 +15,24 @@ with st.sidebar:
     if LOGO_PATH.exists():
         st.image(str(LOGO_PATH), width=160)
 
+    if st.session_state.get("zentrum"):
+        st.caption(f"Zentrum: **{st.session_state['zentrum']}**")
     st.markdown("<br>", unsafe_allow_html=True)
-PATIENT_FILE = Path("data") / "patients.json"
 
-# ---------------------------------------------------------
-# Hilfsfunktionen
-# ---------------------------------------------------------
-def load_patients():
-    if not PATIENT_FILE.exists():
-        return {}
-    try:
-        with open(PATIENT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict):
-            return data
-        else:
-            return {}
-    except json.JSONDecodeError:
-        return {}
-
-def save_patients(data: dict):
-    PATIENT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(PATIENT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-# ---------------------------------------------------------
-# Demo-Berechnungsmodell
-# (vereinfachte Gewichtung, ECMO-Flow & vitale Parameter stärker gewichtet)
-# ---------------------------------------------------------
-def calc_weaning_score(
-    map_mmHg,
-    hr,
-    vasopressor,
-    ecmo_flow,
-    sweep,
-    ecmo_fio2,
-    vent_fio2,
-    peep,
-    dp,
-    lactate,
-    ph,
-    pao2,
-    organ,
-    echo,
-):
-    # alles auf 0..1 Risiko normieren (0 = gut, 1 = schlecht)
-    def clamp01(x): 
-        return max(0.0, min(1.0, x))
-
-    # Hämodynamik
-    if map_mmHg < 55:
-        map_risk = 1.0
-    elif map_mmHg < 65:
-        map_risk = 0.7
-    elif map_mmHg <= 85:
-        map_risk = 0.2
-    else:
-        map_risk = 0.5
-
-    if hr < 50 or hr > 130:
-        hr_risk = 1.0
-    elif 50 <= hr <= 110:
-        hr_risk = 0.3
-    else:
-        hr_risk = 0.6
-
-    vaso_risk = clamp01(vasopressor / 10.0)
-
-    # Oxygenierung / Ventilation
-    if pao2 < 60:
-        pao2_risk = 0.9
-    elif pao2 < 80:
-        pao2_risk = 0.5
-    else:
-        pao2_risk = 0.2
-
-    if lactate > 4:
-        lactate_risk = 1.0
-    elif lactate > 2:
-        lactate_risk = 0.6
-    else:
-        lactate_risk = 0.2
-
-    if ph < 7.2 or ph > 7.5:
-        ph_risk = 0.9
-    elif 7.3 <= ph <= 7.45:
-        ph_risk = 0.2
-    else:
-        ph_risk = 0.5
-
-    # ECMO-Parameter – Flow besonders wichtig
-    if ecmo_flow < 2.0:
-        flow_risk = 1.0
-    elif ecmo_flow < 3.0:
-        flow_risk = 0.6
-    else:
-        flow_risk = 0.2
-
-    sweep_risk = clamp01((sweep - 1.0) / 4.0)  # höherer Sweep = eher schlechter
-    ecmo_fio2_risk = clamp01((ecmo_fio2 - 0.5) / 0.5)
-    vent_fio2_risk = clamp01((vent_fio2 - 0.4) / 0.6)
-    peep_risk = clamp01(abs(peep - 10) / 10.0)
-    dp_risk = clamp01((dp - 12) / 10.0)
-
-    # Organfunktion / Echo (0 = schlecht, 10 = gut)
-    organ_risk = clamp01((10 - organ) / 10.0)
-    echo_risk = clamp01((10 - echo) / 10.0)
-
-    # Gewichtung der Bereiche
-    vitals = (map_risk + hr_risk + vaso_risk + pao2_risk + lactate_risk + ph_risk) / 6
-    ecmo = (flow_risk * 2 + sweep_risk + ecmo_fio2_risk + vent_fio2_risk + peep_risk + dp_risk) / 7
-    organs = (organ_risk + echo_risk) / 2
-
-    # Flow stärker gewichtet -> ECMO-Teil insgesamt stärker
-    total_risk = 0.4 * ecmo + 0.35 * vitals + 0.25 * organs
-    total_risk = clamp01(total_risk)
-
-    success_prob = round((1 - total_risk) * 100, 1)
-    failure_prob = round(100 - success_prob, 1)
-
-    # Ampel-Einteilung
-    if success_prob >= 75:
-        level = "green"
-        text = "🟢 Günstiges Weaning-Szenario (Demo)"
-    elif success_prob >= 50:
-        level = "yellow"
-        text = "🟡 Grenzbereich – engmaschig beobachten (Demo)"
-    else:
-        level = "red"
-        text = "🔴 Ungünstiges Weaning-Szenario (Demo)"
-
-    return success_prob, failure_prob, level, text
+# Daten des angemeldeten Zentrums (ohne Login: gemeinsamer Bestand)
+use_partition(st.session_state.get("zentrum"))
 
 # ---------------------------------------------------------
 # Seite
 # ---------------------------------------------------------
 st.title("🫁 Weaning-Tool (Demo)")
 
-patients = load_patients()
+try:
+    patients = load_patients()
+except StorageError as e:
+    st.error(f"Patientendaten konnten nicht gelesen werden: {e}")
+    st.stop()
+audit.ensure_baseline("patient", patients)
 if not patients:
     st.warning("Bitte zuerst einen Patienten unter **Patientendaten** anlegen.")
     st.stop()
@@ -171,9 +55,14 @@ st.markdown(
 
 # Patient auswählen
 st.markdown("---")
-pat_id = st.selectbox("Patient auswählen", list(patients.keys()))
+# archivierte (abgeschlossene) Läufe erhalten keine neuen Messungen
+active_ids = [pid for pid, p in patients.items() if p.archiv is None]
+if not active_ids:
+    st.warning("Alle Patienten sind archiviert. Bitte einen neuen Patienten anlegen.")
+    st.stop()
+pat_id = st.selectbox("Patient auswählen", active_ids)
 patient = patients[pat_id]
-st.info(f"Aktueller Patient: **{pat_id} – {patient.get('name', '')} ({patient.get('age', '')} Jahre)**")
+st.info(f"Aktueller Patient: **{pat_id} – {patient.name} ({patient.age} Jahre)**")
 
 st.markdown("### Eingabe der aktuellen Parameter")
 
@@ -201,39 +90,69 @@ with col_o:
 with col_e:
     echo = st.slider("Echo-Score LV/RV (0=schlecht, 10=gut)", 0.0, 10.0, 6.0, 0.1)
 
+with_uncertainty = st.checkbox(
+    "Unsicherheitsbereich berechnen (Monte-Carlo über Messfehler der Eingaben)",
+    value=True,
+)
+
 if st.button("Weaning-Risiko berechnen & speichern"):
     success, failure, level, text = calc_weaning_score(
         map_mmHg, hr, vasopressor, ecmo_flow, sweep, ecmo_fio2,
         vent_fio2, peep, dp, lactate, ph, pao2, organ, echo
     )
 
+    spread = None
+    if with_uncertainty:
+        spread = uncertainty.monte_carlo({
+            "MAP": map_mmHg, "HR": hr, "Vasopressor": vasopressor,
+            "ECMO_Flow": ecmo_flow, "Sweep": sweep, "ECMO_FiO2": ecmo_fio2,
+            "Vent_FiO2": vent_fio2, "PEEP": peep, "DP": dp, "Laktat": lactate,
+            "pH": ph, "PaO2": pao2, "Organ": organ, "Echo": echo,
+        })
+
     st.markdown("## Ergebnis (Demo)")
     st.write(f"**Erfolgswahrscheinlichkeit:** {success:.1f} %")
+    if spread:
+        st.write(
+            f"**95 %-Unsicherheitsbereich:** {spread['ci_low']:.1f} – {spread['ci_high']:.1f} % "
+            f"({spread['n']:.0f} Monte-Carlo-Ziehungen)"
+        )
+        st.write(
+            f"**Ampel-Wahrscheinlichkeiten:** 🟢 {spread['p_green']:.0%} · "
+            f"🟡 {spread['p_yellow']:.0%} · 🔴 {spread['p_red']:.0%}"
+        )
     st.write(f"**Risiko für Weaning-Versagen:** {failure:.1f} %")
     st.write(f"**Ampel:** {text}")
 
     # Messung im Verlauf speichern
-    verlauf = patient.get("verlauf", [])
-    verlauf.append({
-        "timestamp": datetime.now().isoformat(timespec="seconds"),
-        "MAP": map_mmHg,
-        "HR": hr,
-        "Vasopressor": vasopressor,
-        "ECMO_Flow": ecmo_flow,
-        "Sweep": sweep,
-        "ECMO_FiO2": ecmo_fio2,
-        "Vent_FiO2": vent_fio2,
-        "PEEP": peep,
-        "DP": dp,
-        "Laktat": lactate,
-        "pH": ph,
-        "PaO2": pao2,
-        "Organ": organ,
-        "Echo": echo,
-        "score": success,
-    })
-    patient["verlauf"] = verlauf
-    patients[pat_id] = patient
+    before = patient.to_dict()
+    measurement = Measurement(
+        timestamp=datetime.now().isoformat(timespec="seconds"),
+        MAP=map_mmHg,
+        HR=hr,
+        Vasopressor=vasopressor,
+        ECMO_Flow=ecmo_flow,
+        Sweep=sweep,
+        ECMO_FiO2=ecmo_fio2,
+        Vent_FiO2=vent_fio2,
+        PEEP=peep,
+        DP=dp,
+        Laktat=lactate,
+        pH=ph,
+        PaO2=pao2,
+        Organ=organ,
+        Echo=echo,
+        score=success,
+        unsicherheit=spread,
+    )
+    patient.verlauf.append(measurement)
+    new_alerts = alerts.evaluate(patient, measurement)
     save_patients(patients)
+    audit.record_change(
+        "patient", pat_id, before, patient.to_dict(),
+        st.session_state.get("user", ""), "Weaning-Tool",
+    )
 
-    st.success("Messung wurde im Verlauf gespeichert.")
\ No newline at end of file
+    st.success("Messung wurde im Verlauf gespeichert.")
+    for alert in new_alerts:
+        st.error(f"🚨 Frühwarnung: {alert.text}")
\ No newline at end of file
@@ -1,7 +1,18 @@
 import streamlit as st
-import json
 from pathlib import Path
 import pandas as pd
+import io
+import zipfile
+
+from utils import alerts, archive, audit, resample
+from utils.reports import (
+    build_all_reports,
+    build_patient_report,
+    export_cohort,
+    pdf_available,
+    report_filename,
+)
+from utils.storage import StorageError, load_patients, save_patients, use_partition
 
 # Sidebar Logo (perfekt zentriert)
 with st.sidebar:
@@ -11,50 +22,188 @@ with st.sidebar:
     if LOGO_PATH.exists():
         st.image(str(LOGO_PATH), width=160)
 
+    if st.session_state.get("zentrum"):
+        st.caption(f"Zentrum: **{st.session_state['zentrum']}**")
     st.markdown("<br>", unsafe_allow_html=True)
 
-PATIENT_FILE = Path("data") / "patients.json"
-
-def load_patients():
-    if not PATIENT_FILE.exists():
-        return {}
-    try:
-        with open(PATIENT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict):
-            return data
-        else:
-            return {}
-    except json.JSONDecodeError:
-        return {}
+# Daten des angemeldeten Zentrums (ohne Login: gemeinsamer Bestand)
+use_partition(st.session_state.get("zentrum"))
 
 st.title("📈 Weaning-Verläufe")
 
-patients = load_patients()
+try:
+    patients = load_patients()
+except StorageError as e:
+    st.error(f"Patientendaten konnten nicht gelesen werden: {e}")
+    st.stop()
+
+audit.ensure_baseline("patient", patients)
 if not patients:
     st.info("Es sind noch keine Patienten/messungen vorhanden.")
     st.stop()
 
 pat_id = st.selectbox("Patient auswählen", list(patients.keys()))
-patient = patients[pat_id]
-st.write(f"Verlauf für: **{patient.get('name','')} ({patient.get('age','')} Jahre)**")
+archived = patients[pat_id].archiv is not None
+try:
+    # archivierte Läufe werden erst hier aus dem Segment gelesen
+    patient = archive.resolve(pat_id, patients[pat_id])
+except archive.ArchiveError as e:
+    st.error(str(e))
+    st.stop()
+st.write(f"Verlauf für: **{patient.name} ({patient.age} Jahre)**")
+if archived:
+    st.caption(f"📦 Archivierter Lauf (explantiert am {patient.explantiert}) – nur lesend.")
 
-verlauf = patient.get("verlauf", [])
+# ---------------------------------------------------------
+# Frühwarn-Alarme
+# ---------------------------------------------------------
+# Alarme liegen auch bei archivierten Läufen im Eintrag in patients.json
+stored = patients[pat_id]
+patient_alerts = alerts.for_patient(stored)
+open_alerts = [a for a in patient_alerts if not a.quittiert]
+if open_alerts:
+    for alert in open_alerts:
+        st.error(f"🚨 {alert.timestamp}: {alert.text}")
+    if st.button("Alarme quittieren"):
+        before = stored.to_dict()
+        alerts.acknowledge(stored)
+        save_patients(patients)
+        audit.record_change(
+            "patient", pat_id, before, stored.to_dict(),
+            st.session_state.get("user", ""), "Verläufe",
+        )
+        st.success("Alle Alarme wurden quittiert.")
+if patient_alerts:
+    with st.expander(f"Alarmhistorie ({len(patient_alerts)})"):
+        st.table([
+            {
+                "Zeitpunkt": a.timestamp,
+                "Regel": a.regel,
+                "Meldung": a.text,
+                "Quittiert": "ja" if a.quittiert else "nein",
+            }
+            for a in patient_alerts
+        ])
+
+verlauf = patient.verlauf
 if not verlauf:
     st.info("Für diesen Patienten wurden noch keine Messungen gespeichert.")
-    st.stop()
+else:
+    df = pd.DataFrame([m.to_dict() for m in verlauf])
 
-df = pd.DataFrame(verlauf)
+    st.subheader("Tabelle der Messungen")
+    st.dataframe(df)
 
-st.subheader("Tabelle der Messungen")
-st.dataframe(df)
+    if "timestamp" in df.columns and "score" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df = df.sort_values("timestamp")
+        df = df.set_index("timestamp")
 
-if "timestamp" in df.columns and "score" in df.columns:
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df = df.sort_values("timestamp")
-    df = df.set_index("timestamp")
+        st.subheader("Score-Verlauf (Demo)")
+        st.line_chart(df["score"])
+    else:
+        st.info("Keine Score-Daten zum Plotten gefunden.")
 
-    st.subheader("Score-Verlauf (Demo)")
-    st.line_chart(df["score"])
-else:
-    st.info("Keine Score-Daten zum Plotten gefunden.")
\ No newline at end of file
+    # ---------------------------------------------------------
+    # Zeitraster (gleichmäßig ausgerichteter Verlauf)
+    # ---------------------------------------------------------
+    with st.expander("Verlauf auf Zeitraster ausrichten"):
+        col_f, col_m, col_g = st.columns(3)
+        with col_f:
+            grid_freq = st.selectbox("Raster", ["15min", "1h", "4h"], index=1)
+        with col_m:
+            grid_method = st.selectbox(
+                "Auffüllen", resample.METHODS,
+                format_func={"locf": "letzter Wert (LOCF)", "linear": "linear"}.get,
+            )
+        with col_g:
+            grid_gap = st.selectbox("Max. Lücke", ["2h", "6h", "12h", "24h"], index=1)
+
+        grid_df = resample.resample({pat_id: patient}, grid_freq, grid_method, grid_gap)
+        n_gaps = int(grid_df["luecke"].sum())
+        st.caption(
+            f"{len(grid_df)} Rasterpunkte, davon {int(grid_df['beobachtet'].sum())} mit Messung"
+            + (f", {n_gaps} in Lücken > {grid_gap}" if n_gaps else "")
+        )
+        st.dataframe(grid_df.drop(columns=["patient_id"]))
+        st.line_chart(grid_df.set_index("timestamp")["score"])
+
+# ---------------------------------------------------------
+# Berichte & Export
+# ---------------------------------------------------------
+st.markdown("---")
+st.subheader("📄 Berichte & Export")
+
+formats = ["html", "pdf"] if pdf_available() else ["html"]
+report_fmt = st.radio("Berichtsformat", formats, horizontal=True)
+mime = {"html": "text/html", "pdf": "application/pdf"}[report_fmt]
+
+# Berichte und Exporte nur auf Anforderung erstellen – nicht bei jedem Rerun
+if st.button(f"Bericht für {pat_id} erstellen"):
+    st.download_button(
+        f"Bericht für {pat_id} herunterladen",
+        data=build_patient_report(pat_id, patient, report_fmt),
+        file_name=report_filename(pat_id, report_fmt),
+        mime=mime,
+    )
+
+include_archived = st.checkbox("Archivierte Läufe einbeziehen", value=False)
+
+
+def export_patients():
+    # Archivsegmente erst beim tatsächlichen Export entpacken
+    if include_archived:
+        return archive.with_archived(patients)
+    return {pid: p for pid, p in patients.items() if p.archiv is None}
+
+
+if st.button("Berichte aller Patienten erstellen"):
+    with st.spinner("Berichte werden erstellt ..."):
+        reports = build_all_reports(export_patients(), report_fmt)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for rid, data in reports.items():
+            zf.writestr(report_filename(rid, report_fmt), data)
+    st.download_button(
+        f"{len(reports)} Berichte als ZIP herunterladen",
+        data=buf.getvalue(),
+        file_name="weaning_berichte.zip",
+        mime="application/zip",
+    )
+
+st.markdown("**Kohorten-Export (alle Patienten, alle Messungen)**")
+if st.button("Kohorten-Export erstellen"):
+    with st.spinner("Kohorte wird exportiert ..."):
+        cohort = export_patients()
+        csv_data = export_cohort(cohort, "csv")
+        try:
+            parquet_data = export_cohort(cohort, "parquet")
+        except ImportError:
+            parquet_data = None
+    col_csv, col_pq = st.columns(2)
+    with col_csv:
+        st.download_button(
+            "CSV herunterladen",
+            data=csv_data,
+            file_name="weaning_kohorte.csv",
+            mime="text/csv",
+        )
+    with col_pq:
+        if parquet_data is None:
+            st.caption("Parquet-Export benötigt `pyarrow`.")
+        else:
+            st.download_button(
+                "Parquet herunterladen",
+                data=parquet_data,
+                file_name="weaning_kohorte.parquet",
+                mime="application/octet-stream",
+            )
+
+if st.button("Ausgerichtete Kohorte (1-h-Raster, LOCF) erstellen"):
+    aligned = resample.resample(export_patients(), "1h", "locf", "6h")
+    st.download_button(
+        "Ausgerichtete Kohorte als CSV herunterladen",
+        data=aligned.to_csv(index=False).encode("utf-8"),
+        file_name="weaning_kohorte_1h.csv",
+        mime="text/csv",
+    )
@@ -0,0 +1,109 @@
+import streamlit as st
+from pathlib import Path
+
+from utils import derived, federated, users
+
+# Sidebar Logo (perfekt zentriert)
+with st.sidebar:
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    LOGO_PATH = Path(__file__).parent.parent / "logo" / "logo_main.png"
+    if LOGO_PATH.exists():
+        st.image(str(LOGO_PATH), width=160)
+
+    st.markdown("<br>", unsafe_allow_html=True)
+
+st.title("🏥 Zentrumsübergreifende Auswertung")
+
+if st.session_state.get("rolle") != "admin":
+    st.warning(
+        "Diese Seite ist nur für Administratoren zugänglich. "
+        "Bitte auf der Startseite mit einem Admin-Konto anmelden."
+    )
+    st.stop()
+
+st.caption(
+    "Abfragen laufen parallel über die Datenbestände aller Zentren. "
+    "Die Daten werden nur gelesen."
+)
+
+
+# ---------------------------------------------------------
+# Zentrumsanträge
+# ---------------------------------------------------------
+st.subheader("Zentrumsanträge")
+accounts = users.load_users()
+requests = users.pending(accounts)
+if not requests:
+    st.info("Keine offenen Anträge.")
+for name, center in requests.items():
+    col_name, col_ok, col_no = st.columns([3, 1, 1])
+    col_name.write(f"**{name}** beantragt Zentrum **{center}**")
+    if col_ok.button("Freigeben", key=f"ok_{name}"):
+        users.decide(accounts, name, approve=True)
+        users.save_users(accounts)
+        st.rerun()
+    if col_no.button("Ablehnen", key=f"no_{name}"):
+        users.decide(accounts, name, approve=False)
+        users.save_users(accounts)
+        st.rerun()
+
+
+def show_errors(errors: dict):
+    for center, msg in errors.items():
+        st.error(f"Zentrum {center}: Daten konnten nicht gelesen werden: {msg}")
+
+
+# ---------------------------------------------------------
+# Übersicht je Zentrum
+# ---------------------------------------------------------
+st.subheader("Übersicht je Zentrum")
+summary, errors = federated.summary()
+show_errors(errors)
+if summary.empty:
+    st.info("Es sind noch keine Daten vorhanden.")
+else:
+    st.dataframe(summary)
+    if derived.score_is_placeholder():
+        st.caption(
+            "Ø 30CERW-Score und Risikokategorien beruhen auf einer vorläufigen "
+            "Punktetabelle (Platzhalter, nicht validiert)."
+        )
+
+# ---------------------------------------------------------
+# 30CERW-Fälle aller Zentren
+# ---------------------------------------------------------
+st.subheader("30CERW-Fälle aller Zentren")
+if st.button("Fälle laden"):
+    cases, errors = federated.all_cases()
+    show_errors(errors)
+    if cases.empty:
+        st.info("Es sind noch keine 30CERW-Fälle vorhanden.")
+    else:
+        st.dataframe(cases)
+        st.download_button(
+            "📥 Fälle als CSV",
+            data=cases.to_csv(index=False).encode("utf-8"),
+            file_name="30cerw_alle_zentren.csv",
+            mime="text/csv",
+        )
+
+# ---------------------------------------------------------
+# Messungen aller Zentren
+# ---------------------------------------------------------
+st.subheader("Messungen aller Zentren")
+include_archived = st.checkbox("Archivierte Läufe einbeziehen", value=False)
+if st.button("Kohorten-Export erstellen"):
+    with st.spinner("Messungen werden zusammengeführt …"):
+        cohort, errors = federated.all_measurements(include_archived)
+    show_errors(errors)
+    if cohort.empty:
+        st.info("Es sind noch keine Messungen vorhanden.")
+    else:
+        st.write(f"{len(cohort)} Messungen aus {cohort['Zentrum'].nunique()} Zentren.")
+        st.download_button(
+            "📥 Messungen als CSV",
+            data=cohort.to_csv(index=False).encode("utf-8"),
+            file_name="kohorte_alle_zentren.csv",
+            mime="text/csv",
+        )
@@ -1,8 +1,8 @@
 import streamlit as st
-import json
-import os
 from pathlib import Path
 
+from utils.users import load_users, register, save_users, user_entry
+
 # -------------------------------------------------------------
 # Grundkonfiguration der App
 # -------------------------------------------------------------
@@ -12,20 +12,12 @@ st.set_page_config(
     layout="centered"
 )
 
-USER_FILE = "data/user.json"
+SESSION_KEYS = ("user", "zentrum", "rolle")
 
-# -------------------------------------------------------------
-# Hilfsfunktionen für Nutzer
-# -------------------------------------------------------------
-def load_users():
-    if not os.path.exists(USER_FILE):
-        return {}
-    with open(USER_FILE, "r") as f:
-        return json.load(f)
 
-def save_users(users):
-    with open(USER_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+def logout():
+    for key in SESSION_KEYS:
+        st.session_state.pop(key, None)
 
 # -------------------------------------------------------------
 # Sidebar: Logo + Navigation
@@ -78,6 +70,13 @@ have_users = len(users) > 0
 # -------------------------------------------------------------
 st.markdown("### 🔐 Login (optional)")
 
+if st.session_state.get("user"):
+    center = st.session_state.get("zentrum") or "kein Zentrum – gemeinsamer Datenbestand"
+    st.success(f"Angemeldet als **{st.session_state['user']}** ({center}).")
+    if st.button("Logout"):
+        logout()
+        st.rerun()
+
 username = st.text_input("Benutzername", key="login_user")
 password = st.text_input("Passwort", type="password", key="login_pass")
 
@@ -95,9 +94,20 @@ if st.button("Login"):
             "Bitte zuerst unten registrieren (optional)."
         )
     else:
-        if username in users and users[username] == password:
-            st.success("Login erfolgreich (Demo – aktuell ohne Einschränkungen).")
+        entry = user_entry(users, username)
+        if entry is not None and entry["passwort"] == password:
+            st.session_state["user"] = username
+            st.session_state["zentrum"] = entry.get("zentrum", "")
+            st.session_state["rolle"] = entry.get("rolle", "nutzer")
+            if st.session_state["zentrum"]:
+                st.success(
+                    f"Login erfolgreich – es werden nur die Daten des Zentrums "
+                    f"**{st.session_state['zentrum']}** geladen."
+                )
+            else:
+                st.success("Login erfolgreich (kein Zentrum – gemeinsamer Datenbestand).")
         else:
+            logout()
             st.warning(
                 "Benutzer nicht gefunden oder Passwort falsch.\n\n"
                 "Falls du noch kein Konto hast, registriere dich unten (optional)."
@@ -116,6 +126,14 @@ st.markdown("### 🧾 Registrierung (optional)")
 
 new_user = st.text_input("Neuer Benutzername", key="reg_user")
 new_pass = st.text_input("Passwort wählen", type="password", key="reg_pass")
+new_center = st.text_input(
+    "Zentrum beantragen (optional)",
+    key="reg_center",
+    help=(
+        "Nutzer desselben Zentrums teilen sich einen Datenbestand. "
+        "Der Zugang wird erst nach Freigabe durch einen Administrator aktiv."
+    ),
+)
 
 if st.button("Jetzt registrieren"):
     if new_user.strip() == "" or new_pass.strip() == "":
@@ -123,12 +141,22 @@ if st.button("Jetzt registrieren"):
     elif new_user in users:
         st.error("Benutzername existiert bereits.")
     else:
-        users[new_user] = new_pass
-        save_users(users)
-        st.success(
-            f"Benutzer **{new_user}** wurde registriert! "
-            "Du kannst dich jetzt im Login-Bereich anmelden (optional)."
-        )
+        try:
+            register(users, new_user, new_pass, new_center)
+        except ValueError:
+            st.error("Der Zentrumsname muss Buchstaben oder Ziffern enthalten.")
+        else:
+            save_users(users)
+            st.success(
+                f"Benutzer **{new_user}** wurde registriert! "
+                "Du kannst dich jetzt im Login-Bereich anmelden (optional)."
+            )
+            if new_center.strip():
+                st.info(
+                    f"Der Zugang zum Zentrum **{new_center.strip()}** muss noch "
+                    "von einem Administrator freigegeben werden. Bis dahin "
+                    "arbeitest du im gemeinsamen Datenbestand."
+                )
 
 # Hinweis unten
 st.markdown(
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from utils import audit, storage
+
+
+@pytest.fixture(autouse=True)
+def audit_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(audit, "CHECKPOINT_INTERVAL", 3)
+    monkeypatch.setattr(audit, "_INDEXES", {})
+    return tmp_path
+
+
+def patient(name="Muster", **extra):
+    return {"name": name, "age": 60, "verlauf": [], **extra}
+
+
+def test_reconstruct_across_checkpoints(audit_dir):
+    audit.record_change("patient", "P1", None, patient())                      # 1
+    audit.record_change("patient", "P2", None, patient("Zwei"))                # 2
+    audit.record_change("patient", "P1", patient(), patient(age=61))           # 3 -> Checkpoint
+    audit.record_change("patient", "P1", patient(age=61), patient(age=62))     # 4
+    audit.record_change("patient", "P1", patient(age=62), patient(age=63, verlauf=[{"MAP": 70}]))  # 5
+
+    assert [cp["seq"] for cp in audit._checkpoints()] == [3]
+    assert audit.reconstruct("patient", "P1", seq=1)["age"] == 60
+    assert audit.reconstruct("patient", "P1", seq=3)["age"] == 61
+    assert audit.reconstruct("patient", "P1", seq=4)["age"] == 62
+    assert audit.reconstruct("patient", "P1") == patient(age=63, verlauf=[{"MAP": 70}])
+    assert audit.reconstruct("patient", "P2", seq=5) == patient("Zwei")
+    assert audit.reconstruct("patient", "P3") is None
+    assert [e["seq"] for e in audit.history("patient", "P1")] == [1, 3, 4, 5]
+
+
+def test_reconstruct_by_time(audit_dir):
+    audit.record_change("patient", "P1", None, patient())
+    assert audit.reconstruct("patient", "P1", at="2000-01-01T00:00:00") is None
+    assert audit.reconstruct("patient", "P1", at="2999-01-01T00:00:00") == patient()
+
+
+def test_restore_after_delete_across_checkpoint(audit_dir):
+    audit.record_change("patient", "P1", None, patient())                      # 1
+    audit.record_change("patient", "P1", patient(), patient(age=70))           # 2
+    audit.record_change("patient", "P2", None, patient("Zwei"))                # 3 -> Checkpoint
+    entry = audit.record_change("patient", "P1", patient(age=70), None)        # 4
+
+    assert audit.deleted_objects("patient") == {"P1": entry["seq"]}
+    state = audit.state_before_delete("patient", "P1", entry["seq"])
+    assert state == patient(age=70)
+
+    audit.record_restore("patient", "P1", state)                               # 5
+    assert audit.deleted_objects("patient") == {}
+    assert audit.reconstruct("patient", "P1") == patient(age=70)
+
+
+def test_index_survives_restart(audit_dir):
+    audit.record_change("patient", "P1", None, patient())
+    audit.record_change("patient", "P2", None, patient())
+    audit.record_change("patient", "P1", patient(), None)  # Checkpoint sichert den Index
+    audit.record_change("patient", "P2", patient(), None)
+    audit._INDEXES.clear()
+
+    assert audit.deleted_objects("patient") == {"P1": 3, "P2": 4}
+
+
+def test_state_before_delete_without_history(audit_dir):
+    assert audit.state_before_delete("patient", "P1", 1) is None
+
+
+def test_concurrent_appends_have_unique_seqs(audit_dir):
+    def work(i):
+        for j in range(10):
+            audit.record_change("patient", f"P{i}-{j}", None, patient())
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    seqs = [e["seq"] for i in range(4) for j in range(10) for e in audit.history("patient", f"P{i}-{j}")]
+    assert sorted(seqs) == list(range(1, 41))
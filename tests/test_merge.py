@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from tests.test_records import study_case
+from utils.merge import MergeError, export_cases, iter_conflicts, iter_entries, iter_errors, main, merge_files
+
+
+def write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+    return path
+
+
+# ---------------------------------------------------------
+# iter_entries
+# ---------------------------------------------------------
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_iter_entries_small_chunks(tmp_path, chunk_size):
+    data = {
+        "a": {"x": -100000.5, "y": [1, 2, {"z": "}{,:"}], "t": True},
+        'b "q"': 1e-7,
+        "ü": None,
+        "c": -12,
+    }
+    path = write(tmp_path / "in.json", data)
+    assert dict(iter_entries(path, chunk_size=chunk_size)) == data
+
+
+def test_iter_entries_empty_object(tmp_path):
+    path = tmp_path / "in.json"
+    path.write_text(" { } ", encoding="utf-8")
+    assert list(iter_entries(path, chunk_size=1)) == []
+
+
+@pytest.mark.parametrize("text", ['{"a": 1', '{"a" 1}', '[1, 2]', '{"a": 1,}'])
+def test_iter_entries_invalid(tmp_path, text):
+    path = tmp_path / "in.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(MergeError):
+        list(iter_entries(path, chunk_size=2))
+
+
+# ---------------------------------------------------------
+# merge_files
+# ---------------------------------------------------------
+def test_merge_dedup_conflict_invalid(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    a = write(tmp_path / "a" / "study.json", {
+        "S1": study_case(Studien_ID="S1", Alter=60),
+        "S2": study_case(Studien_ID="S2"),
+    })
+    b = write(tmp_path / "b" / "study.json", {
+        "S1": study_case(Studien_ID="S1", Alter=70),
+        "S2": study_case(Studien_ID="S2"),
+        "S3": study_case(Studien_ID="S3", Geschlecht={"m": 1}),
+        "S4": study_case(Studien_ID="anders"),
+    })
+    db = tmp_path / "merge.sqlite"
+    stats = merge_files([a, b], db)
+
+    assert (stats.read, stats.added, stats.duplicates, stats.conflicts, stats.invalid) == (6, 2, 1, 1, 2)
+    assert stats.failed_files == []
+
+    [conflict] = iter_conflicts(db)
+    assert conflict["Studien_ID"] == "S1"
+    assert conflict["behalten_aus"] == str(a)
+    assert conflict["abweichend_in"] == str(b)
+    assert conflict["diff"] == {"Alter": [60, 70]}
+
+    errors = {e["Studien_ID"]: e for e in iter_errors(db)}
+    assert errors.keys() == {"S3", "S4"}
+    assert errors["S3"]["Datei"] == str(b)
+    assert "Geschlecht" in errors["S3"]["Fehler"]
+
+    out = tmp_path / "out.json"
+    export_cases(db, out)
+    merged = json.loads(out.read_text(encoding="utf-8"))
+    assert sorted(merged) == ["S1", "S2"]
+    assert merged["S1"]["Alter"] == 60
+
+
+def test_merge_discards_partially_read_file(tmp_path):
+    good = write(tmp_path / "good.json", {"S1": study_case(Studien_ID="S1")})
+    bad = tmp_path / "bad.json"
+    text = json.dumps({"S9": study_case(Studien_ID="S9"), "S8": study_case(Studien_ID="S8")})
+    bad.write_text(text[: len(text) // 2 + len(text) // 4], encoding="utf-8")
+    db = tmp_path / "merge.sqlite"
+
+    stats = merge_files([good, bad], db)
+
+    assert stats.failed_files == [str(bad)]
+    assert (stats.read, stats.added, stats.invalid) == (1, 1, 0)
+    out = tmp_path / "out.json"
+    export_cases(db, out)
+    assert sorted(json.loads(out.read_text(encoding="utf-8"))) == ["S1"]
+    [error] = iter_errors(db)
+    assert error["Datei"] == str(bad) and error["Studien_ID"] is None
+
+
+def test_cli_writes_errors(tmp_path, capsys):
+    src = write(tmp_path / "in.json", {
+        "S1": study_case(Studien_ID="S1"),
+        "S2": study_case(Studien_ID="S2", Alter="alt"),
+    })
+    out, errors = tmp_path / "out.json", tmp_path / "errors.jsonl"
+
+    main([str(out), str(src), "--errors", str(errors)])
+
+    [line] = errors.read_text(encoding="utf-8").splitlines()
+    assert json.loads(line)["Studien_ID"] == "S2"
+    assert "1 übernommen" in capsys.readouterr().out
@@ -0,0 +1,68 @@
+from typing import Literal, get_origin
+
+import pytest
+
+from utils.records import IsoDate, Measurement, Patient, StudyCase, ValidationError
+
+
+def measurement(**overrides):
+    data = {
+        "timestamp": "2025-01-01T08:00:00",
+        "MAP": 70.0, "HR": 90.0, "Vasopressor": 2.0, "ECMO_Flow": 3.0,
+        "Sweep": 2.0, "ECMO_FiO2": 0.5, "Vent_FiO2": 0.4, "PEEP": 8.0,
+        "DP": 12.0, "Laktat": 2.0, "pH": 7.4, "PaO2": 90.0, "Organ": 5.0,
+        "Echo": 5.0, "score": 60.0,
+    }
+    data.update(overrides)
+    return data
+
+
+def study_case(**overrides):
+    data = {}
+    for name, f in StudyCase.__dataclass_fields__.items():
+        if get_origin(f.type) is Literal:
+            data[name] = "-"
+        elif f.type is IsoDate:
+            data[name] = "2025-01-01"
+        elif f.type in (int, float):
+            data[name] = f.type(1)
+        elif f.type is str:
+            data[name] = ""
+    data.update(Studien_ID="S1", Formelversionen={})
+    data.update(overrides)
+    return data
+
+
+def test_roundtrip():
+    raw = {"name": "A", "age": 50, "diagnose": "x", "verlauf": [measurement()]}
+    patient = Patient.from_dict(raw, "P1")
+    assert isinstance(patient.verlauf[0], Measurement)
+    assert Patient.from_dict(patient.to_dict(), "P1") == patient
+
+
+def test_int_is_accepted_as_float():
+    assert Measurement.from_dict(measurement(MAP=70)).MAP == 70.0
+
+
+@pytest.mark.parametrize(
+    "overrides, message",
+    [
+        ({"MAP": "x"}, "P1.verlauf[0].MAP: Zahl erwartet"),
+        ({"timestamp": "gestern"}, "P1.verlauf[0].timestamp: Zeitstempel erwartet"),
+        ({"unbekannt": 1}, "P1.verlauf[0]: unbekannte Felder"),
+    ],
+)
+def test_error_path(overrides, message):
+    raw = {"verlauf": [measurement(**overrides)]}
+    with pytest.raises(ValidationError, match=message.replace("[", r"\[").replace("]", r"\]")):
+        Patient.from_dict(raw, "P1")
+
+
+def test_study_case_valid():
+    assert StudyCase.from_dict(study_case(Geschlecht="w"), "S1").Geschlecht == "w"
+
+
+@pytest.mark.parametrize("value", [["m"], {"m": 1}, None, 1])
+def test_literal_rejects_unhashable_and_foreign_values(value):
+    with pytest.raises(ValidationError, match="S1.Geschlecht: ungültiger Wert"):
+        StudyCase.from_dict(study_case(Geschlecht=value), "S1")
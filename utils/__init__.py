@@ -0,0 +1 @@
+"""Gemeinsame Hilfsmodule für die Streamlit-Seiten."""
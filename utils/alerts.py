@@ -0,0 +1,220 @@
+"""Regelbasierte Frühwarn-Alarme über den gespeicherten Messungen.
+
+Regeln werden als JSON konfiguriert (``data/alert_rules.json``, sonst
+``DEFAULT_RULES``) und einmalig in Regelobjekte übersetzt. Jede Regel hält
+einen kleinen, serialisierbaren Zustand je Patient
+(``Patient.alert_state``), sodass eine neue Messung in O(Anzahl Regeln)
+ausgewertet wird, ohne den Verlauf erneut zu lesen.
+
+Ein Alarm wird beim Übergang in den auffälligen Zustand ausgelöst und erst
+wieder, nachdem die Bedingung zwischenzeitlich nicht mehr erfüllt war.
+"""
+import hashlib
+import json
+import operator
+from datetime import datetime
+
+from utils.records import Alert, Measurement, Patient
+from utils.storage import DATA_DIR
+
+RULES_FILE = DATA_DIR / "alert_rules.json"
+
+DEFAULT_RULES = [
+    {
+        "id": "score_abfall",
+        "typ": "score_abfall",
+        "punkte": 15,
+        "stunden": 6,
+        "text": "Weaning-Score innerhalb von 6 h um mehr als 15 Punkte gefallen",
+    },
+    {
+        "id": "laktat_anstieg",
+        "typ": "anstieg",
+        "parameter": "Laktat",
+        "anzahl": 3,
+        "text": "Laktat in 3 aufeinanderfolgenden Messungen gestiegen",
+    },
+    {
+        "id": "flow_map",
+        "typ": "schwelle",
+        "bedingungen": [["ECMO_Flow", "<", 2.0], ["MAP", "<", 55]],
+        "text": "ECMO-Flow < 2 L/min bei MAP < 55 mmHg",
+    },
+]
+
+_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+}
+
+
+class RuleError(ValueError):
+    """Eine Regelkonfiguration ist ungültig."""
+
+
+def _epoch(timestamp: str) -> float:
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+# ---------------------------------------------------------
+# Regeltypen
+# ---------------------------------------------------------
+# ``step(state, m) -> (neuer Zustand, Bedingung erfüllt)``; der Zustand wird
+# nie verändert, sondern neu erzeugt (das Änderungsprotokoll vergleicht alte
+# und neue Werte).
+class ScoreDropRule:
+    """Score fällt innerhalb von ``stunden`` um mehr als ``punkte``.
+
+    Zustand: monoton fallende Liste ``[[Zeit, Score], ...]`` der Maxima im
+    Zeitfenster – der erste Eintrag ist stets das Fenster-Maximum.
+    """
+
+    def __init__(self, cfg):
+        self.points = float(cfg["punkte"])
+        self.window = float(cfg["stunden"]) * 3600
+
+    def step(self, state, m: Measurement):
+        t = _epoch(m.timestamp)
+        maxima = [p for p in (state or []) if p[0] >= t - self.window]
+        hit = bool(maxima) and maxima[0][1] - m.score > self.points
+        while maxima and maxima[-1][1] <= m.score:
+            maxima.pop()
+        maxima.append([t, m.score])
+        return maxima, hit
+
+
+class RiseRule:
+    """``parameter`` steigt in ``anzahl`` aufeinanderfolgenden Messungen."""
+
+    def __init__(self, cfg):
+        self.param = cfg["parameter"]
+        self.count = int(cfg["anzahl"])
+        if self.param not in Measurement.__dataclass_fields__:
+            raise RuleError(f"Unbekannter Parameter: {self.param}")
+
+    def step(self, state, m: Measurement):
+        value = getattr(m, self.param)
+        last, run = state if state else (None, 0)
+        run = run + 1 if last is not None and value > last else 0
+        return [value, run], run >= self.count
+
+
+class ThresholdRule:
+    """Alle ``bedingungen`` ``[Parameter, Operator, Wert]`` gleichzeitig erfüllt."""
+
+    def __init__(self, cfg):
+        self.checks = []
+        for param, op, limit in cfg["bedingungen"]:
+            if param not in Measurement.__dataclass_fields__ or op not in _OPS:
+                raise RuleError(f"Ungültige Bedingung: {param} {op} {limit}")
+            self.checks.append((param, _OPS[op], float(limit)))
+
+    def step(self, state, m: Measurement):
+        return None, all(op(getattr(m, param), limit) for param, op, limit in self.checks)
+
+
+_RULE_TYPES = {
+    "score_abfall": ScoreDropRule,
+    "anstieg": RiseRule,
+    "schwelle": ThresholdRule,
+}
+
+
+class CompiledRule:
+    __slots__ = ("id", "text", "version", "impl")
+
+    def __init__(self, cfg: dict):
+        if cfg.get("typ") not in _RULE_TYPES:
+            raise RuleError(f"Unbekannter Regeltyp: {cfg.get('typ')!r}")
+        self.id = cfg["id"]
+        self.text = cfg["text"]
+        # Konfigurationsänderungen machen gespeicherte Zustände ungültig
+        self.version = hashlib.sha1(
+            json.dumps(cfg, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:8]
+        self.impl = _RULE_TYPES[cfg["typ"]](cfg)
+
+
+# ---------------------------------------------------------
+# Regeln laden
+# ---------------------------------------------------------
+_compiled = {}
+
+
+def load_rules() -> list:
+    """Regeln aus ``alert_rules.json`` (oder Standardregeln) übersetzt liefern."""
+    if RULES_FILE.exists():
+        with open(RULES_FILE, "r", encoding="utf-8") as f:
+            configs = json.load(f)
+    else:
+        configs = DEFAULT_RULES
+    key = json.dumps(configs, sort_keys=True)
+    if key not in _compiled:
+        _compiled.clear()
+        _compiled[key] = [CompiledRule(cfg) for cfg in configs]
+    return _compiled[key]
+
+
+# ---------------------------------------------------------
+# Auswertung
+# ---------------------------------------------------------
+def _run(rules, state: dict, m: Measurement):
+    """Alle Regeln auf eine Messung anwenden -> (neuer Zustand, ausgelöste Regeln)."""
+    new_state, fired = {}, []
+    for rule in rules:
+        entry = state.get(rule.id)
+        if not entry or entry.get("v") != rule.version:
+            entry = {"v": rule.version, "s": None, "aktiv": False}
+        rule_state, hit = rule.impl.step(entry["s"], m)
+        if hit and not entry["aktiv"]:
+            fired.append(rule)
+        new_state[rule.id] = {"v": rule.version, "s": rule_state, "aktiv": hit}
+    return new_state, fired
+
+
+def evaluate(patient: Patient, measurement: Measurement, rules=None) -> list:
+    """Neue Messung auswerten (nach dem Anhängen an ``verlauf``).
+
+    Aktualisiert ``alert_state`` und ``alerts`` des Patienten und gibt die
+    neu ausgelösten Alarme zurück.
+    """
+    rules = load_rules() if rules is None else rules
+    if any(
+        patient.alert_state.get(r.id, {}).get("v") != r.version for r in rules
+    ) and len(patient.verlauf) > 1:
+        # Regeln neu/geändert: Zustand einmalig aus dem bisherigen Verlauf aufbauen
+        rebuild_state(patient, rules, upto=len(patient.verlauf) - 1)
+
+    patient.alert_state, fired = _run(rules, patient.alert_state, measurement)
+    new_alerts = [
+        Alert(timestamp=measurement.timestamp, regel=rule.id, text=rule.text)
+        for rule in fired
+    ]
+    patient.alerts = patient.alerts + new_alerts
+    return new_alerts
+
+
+def rebuild_state(patient: Patient, rules=None, upto=None):
+    """Regelzustand aus dem Verlauf neu aufbauen, ohne Alarme auszulösen."""
+    rules = load_rules() if rules is None else rules
+    state = {}
+    for m in patient.verlauf[:upto]:
+        state, _ = _run(rules, state, m)
+    patient.alert_state = state
+
+
+def for_patient(patient: Patient, open_only: bool = False) -> list:
+    """Alarme eines Patienten, neueste zuerst."""
+    alerts = [a for a in patient.alerts if not (open_only and a.quittiert)]
+    return sorted(alerts, key=lambda a: a.timestamp, reverse=True)
+
+
+def acknowledge(patient: Patient):
+    """Alle offenen Alarme des Patienten quittieren."""
+    patient.alerts = [
+        Alert(timestamp=a.timestamp, regel=a.regel, text=a.text, quittiert=True)
+        for a in patient.alerts
+    ]
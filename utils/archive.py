@@ -0,0 +1,151 @@
+"""Archivierung abgeschlossener ECMO-Läufe in komprimierte Segmente.
+
+Patienten mit Explantationsdatum werden aus ``patients.json`` in
+unveränderliche Segmentdateien unter ``archive/`` der aktiven
+Datenpartition verschoben (zstd, falls ``zstandard`` installiert ist,
+sonst gzip). In ``patients.json`` bleibt nur ein kleiner Eintrag mit den
+Stammdaten, den Alarmen (damit offene Alarme sichtbar bleiben) und
+``archiv = {"segment": ..., "messungen": ..., "sha256": ...}`` zurück.
+Jeder Lesezugriff prüft die Prüfsumme des Segments.
+
+Einzelne Patienten werden bei Bedarf aus ihrem Segment gelesen,
+``with_archived`` löst für Kohortenauswertungen alle Stubs segmentweise auf.
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from functools import lru_cache
+
+from utils.records import Patient
+from utils.storage import data_dir
+
+# Obergrenze je Segment, damit ein Einzelzugriff nicht zu viel entpackt
+SEGMENT_MAX_PATIENTS = 50
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+_READ_ERRORS = (IndexError, OSError, ValueError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+class ArchiveError(Exception):
+    """Ein Archivsegment fehlt oder ist beschädigt."""
+
+
+def archive_dir():
+    return data_dir() / "archive"
+
+
+def _compress(raw: bytes):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(raw), ".json.zst"
+    return gzip.compress(raw, compresslevel=9), ".json.gz"
+
+
+def _decompress(name: str, data: bytes) -> bytes:
+    if name.endswith(".zst"):
+        if zstandard is None:
+            raise ArchiveError(f"{name}: zum Lesen wird das Paket 'zstandard' benötigt")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+# ---------------------------------------------------------
+# Schreiben
+# ---------------------------------------------------------
+def closed_patients(patients: dict) -> list:
+    """IDs der Patienten mit abgeschlossenem, noch nicht archiviertem Lauf."""
+    return [pid for pid, p in patients.items() if p.explantiert and p.archiv is None]
+
+
+def _write_segment(batch: dict) -> tuple:
+    raw = json.dumps(
+        {pid: p.to_dict() for pid, p in batch.items()},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    data, suffix = _compress(raw)
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"seg-{datetime.now():%Y%m%d%H%M%S}-{digest[:12]}{suffix}"
+    archive_dir().mkdir(parents=True, exist_ok=True)
+    path = archive_dir() / name
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return name, digest
+
+
+def archive_closed(patients: dict, ids=None) -> list:
+    """Abgeschlossene Patienten archivieren und durch Stubs ersetzen.
+
+    ``patients`` wird verändert; der Aufrufer speichert anschließend mit
+    ``save_patients``. Gibt die archivierten IDs zurück.
+    """
+    ids = closed_patients(patients) if ids is None else ids
+    for start in range(0, len(ids), SEGMENT_MAX_PATIENTS):
+        chunk = ids[start:start + SEGMENT_MAX_PATIENTS]
+        name, digest = _write_segment({pid: patients[pid] for pid in chunk})
+        for pid in chunk:
+            full = patients[pid]
+            patients[pid] = Patient(
+                name=full.name,
+                age=full.age,
+                diagnose=full.diagnose,
+                explantiert=full.explantiert,
+                alerts=full.alerts,
+                archiv={
+                    "segment": name,
+                    "sha256": digest,
+                    "messungen": len(full.verlauf),
+                    "archiviert_am": datetime.now().isoformat(timespec="seconds"),
+                },
+            )
+    return list(ids)
+
+
+# ---------------------------------------------------------
+# Lesen
+# ---------------------------------------------------------
+@lru_cache(maxsize=8)
+def _read_segment(path) -> dict:
+    name = path.name
+    if not path.exists():
+        raise ArchiveError(f"Archivsegment {name} nicht gefunden")
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        if not name.split("-")[2].startswith(digest[:12]):
+            raise ArchiveError(f"Archivsegment {name} ist beschädigt (Prüfsumme)")
+        return {"sha256": digest, "patients": json.loads(_decompress(name, data))}
+    except _READ_ERRORS as e:
+        raise ArchiveError(f"Archivsegment {name} ist nicht lesbar: {e}") from e
+
+
+def load_archived(pat_id: str, stub: Patient) -> Patient:
+    """Vollständigen Patienten aus seinem Archivsegment lesen."""
+    name = stub.archiv["segment"]
+    segment = _read_segment(archive_dir() / name)
+    if segment["sha256"] != stub.archiv["sha256"]:
+        raise ArchiveError(f"Archivsegment {name} passt nicht zur Prüfsumme von {pat_id}")
+    if pat_id not in segment["patients"]:
+        raise ArchiveError(f"Patient {pat_id} fehlt in {name}")
+    return Patient.from_dict(segment["patients"][pat_id], pat_id)
+
+
+def resolve(pat_id: str, patient: Patient) -> Patient:
+    """Aktiven Patienten unverändert, archivierten vollständig liefern."""
+    return load_archived(pat_id, patient) if patient.archiv is not None else patient
+
+
+def with_archived(patients: dict) -> dict:
+    """Aktive und archivierte Patienten vollständig (für Kohortenexporte)."""
+    # nach Segment sortiert, damit jedes Segment nur einmal gelesen wird
+    order = sorted(patients, key=lambda pid: (patients[pid].archiv or {}).get("segment", ""))
+    full = {pid: resolve(pid, patients[pid]) for pid in order}
+    return {pid: full[pid] for pid in patients}
@@ -0,0 +1,388 @@
+"""Änderungsprotokoll (Audit-Trail) für Patienten und 30CERW-Fälle.
+
+Jede Änderung wird als eine Zeile an ``audit_log.jsonl`` angehängt und
+enthält nur die feldweise Differenz zum vorherigen Stand:
+
+    {"seq": 17, "ts": "...", "user": "...", "page": "...",
+     "kind": "patient", "id": "ECMO-1", "op": "update",
+     "delta": {"set": {...}, "unset": [...], "append": {"verlauf": [...]}}}
+
+Nach jeweils ``CHECKPOINT_INTERVAL`` Einträgen wird der vollständige Stand
+als komprimierter Checkpoint abgelegt. Für eine Rekonstruktion zu einem
+beliebigen Zeitpunkt wird der letzte Checkpoint davor geladen und nur der
+Rest des Protokolls ab dessen Byte-Position nachgespielt.
+
+Schreibzugriffe mehrerer Sitzungen werden über eine Sperrdatei serialisiert,
+damit keine laufende Nummer doppelt vergeben wird. Ein kleiner Index
+(gelöschte Objekte, Byte-Positionen je Objekt) wird im Speicher gehalten und
+nur um neu angehängte Zeilen ergänzt; mit jedem Checkpoint wird er auch auf
+Platte gesichert.
+"""
+import gzip
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils.storage import data_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CHECKPOINT_INTERVAL = 500
+
+
+# Protokoll und Checkpoints liegen in der aktiven Datenpartition
+def _audit_file():
+    return data_dir() / "audit_log.jsonl"
+
+
+def _checkpoint_dir():
+    return data_dir() / "audit_checkpoints"
+
+
+def _checkpoint_index():
+    return _checkpoint_dir() / "index.jsonl"
+
+
+def _lock_file():
+    return data_dir() / "audit_log.lock"
+
+
+def _object_index_file():
+    return data_dir() / "audit_index.json"
+
+
+@contextmanager
+def _locked():
+    """Exklusive Sperre für Schreibzugriffe auf das Protokoll (prozessübergreifend)."""
+    path = _lock_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ---------------------------------------------------------
+# Deltas
+# ---------------------------------------------------------
+def make_delta(old: dict, new: dict) -> dict:
+    """Feldweise Differenz; an Listen angehängte Einträge als ``append``."""
+    delta = {}
+    set_, append = {}, {}
+    for key, value in new.items():
+        if key not in old:
+            set_[key] = value
+            continue
+        prev = old[key]
+        if prev == value:
+            continue
+        if (
+            isinstance(prev, list)
+            and isinstance(value, list)
+            and len(value) > len(prev)
+            and value[:len(prev)] == prev
+        ):
+            append[key] = value[len(prev):]
+        else:
+            set_[key] = value
+    unset = [key for key in old if key not in new]
+    if set_:
+        delta["set"] = set_
+    if unset:
+        delta["unset"] = unset
+    if append:
+        delta["append"] = append
+    return delta
+
+
+def apply_entry(state, entry: dict):
+    """Einen Protokolleintrag auf den Stand eines Objekts anwenden."""
+    op = entry["op"]
+    if op == "delete":
+        return None
+    delta = entry["delta"]
+    if op in ("create", "restore"):
+        return dict(delta.get("set", {}))
+    state = dict(state or {})
+    state.update(delta.get("set", {}))
+    for key in delta.get("unset", []):
+        state.pop(key, None)
+    for key, items in delta.get("append", {}).items():
+        state[key] = list(state.get(key, [])) + items
+    return state
+
+
+# ---------------------------------------------------------
+# Schreiben
+# ---------------------------------------------------------
+def _last_seq() -> int:
+    """Laufende Nummer des letzten Eintrags (liest nur das Dateiende)."""
+    if not _audit_file().exists():
+        return 0
+    with open(_audit_file(), "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        step = 4096
+        pos = end
+        while pos > 0:
+            pos = max(0, pos - step)
+            f.seek(pos)
+            tail = f.read(end - pos)
+            lines = tail.rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or pos == 0:
+                last = lines[-1]
+                return json.loads(last)["seq"] if last else 0
+            step *= 2
+    return 0
+
+
+def _append(kind: str, obj_id: str, op: str, delta: dict, user: str, page: str) -> dict:
+    with _locked():
+        return _append_locked(kind, obj_id, op, delta, user, page)
+
+
+def _append_locked(kind: str, obj_id: str, op: str, delta: dict, user: str, page: str) -> dict:
+    entry = {
+        "seq": _last_seq() + 1,
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "user": user or "anonym",
+        "page": page,
+        "kind": kind,
+        "id": obj_id,
+        "op": op,
+        "delta": delta,
+    }
+    _audit_file().parent.mkdir(parents=True, exist_ok=True)
+    with open(_audit_file(), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    if entry["seq"] % CHECKPOINT_INTERVAL == 0:
+        _write_checkpoint(entry["seq"])
+    return entry
+
+
+def record_change(kind: str, obj_id: str, old, new, user: str = "", page: str = ""):
+    """Änderung protokollieren; ``old``/``new`` sind JSON-Dicts oder ``None``.
+
+    Gibt den geschriebenen Eintrag zurück (``None``, wenn sich nichts geändert hat).
+    """
+    if old is None and new is None:
+        return None
+    if new is None:
+        op, delta = "delete", {}
+    elif old is None:
+        op, delta = "create", {"set": new}
+    else:
+        op, delta = "update", make_delta(old, new)
+        if not delta:
+            return None
+    return _append(kind, obj_id, op, delta, user, page)
+
+
+def record_restore(kind: str, obj_id: str, state: dict, user: str = "", page: str = ""):
+    """Wiederherstellung eines gelöschten Objekts protokollieren."""
+    return _append(kind, obj_id, "restore", {"set": state}, user, page)
+
+
+def ensure_baseline(kind: str, objects: dict):
+    """Bereits vorhandene Daten einmalig als Ausgangsstand protokollieren.
+
+    Daten, die vor Einführung des Protokolls gespeichert wurden, wären sonst
+    nicht rekonstruierbar. ``objects`` ist ``{ID: Datensatz}``.
+    """
+    marker = _checkpoint_dir() / f"baseline_{kind}"
+    if marker.exists():
+        return
+    with _locked():
+        if marker.exists():  # inzwischen von einer anderen Sitzung angelegt
+            return
+        for obj_id, record in objects.items():
+            _append_locked(kind, obj_id, "create", {"set": record.to_dict()}, "system", "Ausgangsstand")
+        _checkpoint_dir().mkdir(parents=True, exist_ok=True)
+        marker.touch()
+
+
+# ---------------------------------------------------------
+# Checkpoints
+# ---------------------------------------------------------
+def _checkpoints() -> list:
+    if not _checkpoint_index().exists():
+        return []
+    with open(_checkpoint_index(), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _base_for(seq=None, ts=None):
+    """Letzten Checkpoint vor ``seq``/``ts`` laden -> (Stand, Byte-Position)."""
+    best = None
+    for cp in _checkpoints():
+        if seq is not None and cp["seq"] > seq:
+            break
+        if ts is not None and cp["ts"] > ts:
+            break
+        best = cp
+    if best is None:
+        return {}, 0
+    with gzip.open(_checkpoint_dir() / best["file"], "rt", encoding="utf-8") as f:
+        return json.load(f), best["offset"]
+
+
+def _replay(state: dict, offset: int, seq=None, ts=None, only=None):
+    """Protokoll ab ``offset`` bis einschließlich ``seq``/``ts`` nachspielen."""
+    if not _audit_file().exists():
+        return state, offset
+    with open(_audit_file(), "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            entry = json.loads(raw)
+            if seq is not None and entry["seq"] > seq:
+                break
+            if ts is not None and entry["ts"] > ts:
+                break
+            offset += len(raw)
+            key = (entry["kind"], entry["id"])
+            if only is not None and key != only:
+                continue
+            bucket = state.setdefault(entry["kind"], {})
+            new = apply_entry(bucket.get(entry["id"]), entry)
+            if new is None:
+                bucket.pop(entry["id"], None)
+            else:
+                bucket[entry["id"]] = new
+    return state, offset
+
+
+def _write_checkpoint(seq: int):
+    state, offset = _base_for(seq=seq)
+    state, offset = _replay(state, offset, seq=seq)
+    _checkpoint_dir().mkdir(parents=True, exist_ok=True)
+    name = f"cp-{seq:010d}.json.gz"
+    with gzip.open(_checkpoint_dir() / name, "wt", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+    with open(_checkpoint_index(), "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "seq": seq,
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "offset": offset,
+            "file": name,
+        }) + "\n")
+    _save_object_index(_object_index())
+
+
+# ---------------------------------------------------------
+# Objekt-Index
+# ---------------------------------------------------------
+# {"end": gelesene Bytes, "deleted": {Art: {ID: seq}}, "offsets": {Art: {ID: [Byte, ...]}}}
+_INDEXES = {}
+_INDEX_LOCK = threading.Lock()
+
+
+def _empty_index() -> dict:
+    return {"end": 0, "deleted": {}, "offsets": {}}
+
+
+def _load_object_index(size: int) -> dict:
+    path = _object_index_file()
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index["end"] <= size:
+                return index
+        except (ValueError, KeyError):
+            pass
+    return _empty_index()
+
+
+def _save_object_index(index: dict):
+    path = _object_index_file()
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _object_index() -> dict:
+    """Index auf den aktuellen Stand des Protokolls bringen (liest nur neue Zeilen)."""
+    path = _audit_file()
+    size = path.stat().st_size if path.exists() else 0
+    key = str(path.resolve()) if path.exists() else str(path)
+    with _INDEX_LOCK:
+        index = _INDEXES.get(key)
+        if index is None or index["end"] > size:
+            index = _load_object_index(size)
+            _INDEXES[key] = index
+        if index["end"] == size:
+            return index
+        with open(path, "rb") as f:
+            f.seek(index["end"])
+            offset = index["end"]
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Zeile wird gerade geschrieben
+                entry = json.loads(raw)
+                kind, obj_id = entry["kind"], entry["id"]
+                index["offsets"].setdefault(kind, {}).setdefault(obj_id, []).append(offset)
+                deleted = index["deleted"].setdefault(kind, {})
+                if entry["op"] == "delete":
+                    deleted[obj_id] = entry["seq"]
+                else:
+                    deleted.pop(obj_id, None)
+                offset += len(raw)
+            index["end"] = offset
+        return index
+
+
+# ---------------------------------------------------------
+# Abfragen
+# ---------------------------------------------------------
+def reconstruct(kind: str, obj_id: str, at=None, seq=None):
+    """Stand eines Objekts zu einem Zeitpunkt (``datetime``/ISO) oder nach ``seq``.
+
+    Ohne Angabe wird der letzte protokollierte Stand geliefert. Gibt ``None``
+    zurück, wenn das Objekt zu diesem Zeitpunkt nicht existierte.
+    """
+    ts = at.isoformat(timespec="seconds") if isinstance(at, datetime) else at
+    state, offset = _base_for(seq=seq, ts=ts)
+    state = {kind: {obj_id: state[kind][obj_id]}} if obj_id in state.get(kind, {}) else {}
+    state, _ = _replay(state, offset, seq=seq, ts=ts, only=(kind, obj_id))
+    return state.get(kind, {}).get(obj_id)
+
+
+def history(kind: str, obj_id: str) -> list:
+    """Alle Protokolleinträge eines Objekts (älteste zuerst)."""
+    offsets = _object_index()["offsets"].get(kind, {}).get(obj_id, [])
+    if not offsets:
+        return []
+    entries = []
+    with open(_audit_file(), "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            entries.append(json.loads(f.readline()))
+    return entries
+
+
+def deleted_objects(kind: str) -> dict:
+    """Aktuell gelöschte Objekte als ``{ID: seq des Löscheintrags}``."""
+    return dict(_object_index()["deleted"].get(kind, {}))
+
+
+def state_before_delete(kind: str, obj_id: str, delete_seq: int):
+    """Letzter Stand vor dem Löschen (für „Rückgängig“)."""
+    return reconstruct(kind, obj_id, seq=delete_seq - 1)
@@ -0,0 +1,256 @@
+"""Abgeleitete Felder für 30CERW-Fälle (BMI, ECMO-Dauer, 30CERW-Score).
+
+Die Punktetabelle des 30CERW-Scores ist Konfiguration (siehe unten) und
+derzeit ein als solcher gekennzeichneter Platzhalter.
+
+Jede Ableitung wird deklarativ mit ihren Eingabefeldern und einer
+Formelversion registriert:
+
+    @derived("BMI", inputs=("Koerpergroesse_cm", "Koerpergewicht_kg"), version=1)
+    def bmi(height_cm, weight_kg): ...
+
+Eingaben dürfen selbst abgeleitete Felder sein; die Auswertung erfolgt in
+topologischer Reihenfolge. Jeder Fall merkt sich in ``Formelversionen``, mit
+welcher Version seine Felder berechnet wurden. Wird eine Formel geändert
+(Version hochzählen), berechnet ``recompute_store`` nur dieses Feld und die
+davon abhängigen Felder neu.
+"""
+import json
+import operator
+from dataclasses import dataclass
+from datetime import date
+
+from utils.records import StudyCase
+from utils.storage import DATA_DIR
+
+
+@dataclass(frozen=True)
+class Derivation:
+    name: str
+    inputs: tuple
+    func: object
+    version: int
+
+
+_REGISTRY: dict[str, Derivation] = {}
+_ORDER = None
+
+
+def derived(name: str, inputs: tuple, version: int = 1):
+    """Decorator: Funktion als Berechnungsvorschrift für ``name`` registrieren."""
+
+    def register(func):
+        global _ORDER
+        _REGISTRY[name] = Derivation(name, tuple(inputs), func, version)
+        _ORDER = None
+        return func
+
+    return register
+
+
+# ---------------------------------------------------------
+# Abhängigkeiten
+# ---------------------------------------------------------
+def _order() -> list:
+    """Registrierte Ableitungen in Auswertungsreihenfolge."""
+    global _ORDER
+    if _ORDER is None:
+        done, order = set(), []
+
+        def visit(name, path=()):
+            if name in done or name not in _REGISTRY:
+                return
+            if name in path:
+                raise ValueError(f"Zyklische Ableitung: {' -> '.join(path + (name,))}")
+            for dep in _REGISTRY[name].inputs:
+                visit(dep, path + (name,))
+            done.add(name)
+            order.append(_REGISTRY[name])
+
+        for name in _REGISTRY:
+            visit(name)
+        _ORDER = order
+    return _ORDER
+
+
+def affected(changed: set) -> set:
+    """Alle abgeleiteten Felder, die (transitiv) von ``changed`` abhängen."""
+    dirty = set(changed)
+    for d in _order():
+        if dirty.intersection(d.inputs):
+            dirty.add(d.name)
+    return dirty & _REGISTRY.keys()
+
+
+def current_versions() -> dict:
+    return {d.name: d.version for d in _order()}
+
+
+def _compute(case: StudyCase, names: set) -> bool:
+    """Die Felder ``names`` neu berechnen; True, falls sich ein Wert geändert hat."""
+    changed = False
+    for d in _order():
+        if d.name not in names:
+            continue
+        value = d.func(*(getattr(case, f) for f in d.inputs))
+        if getattr(case, d.name) != value:
+            setattr(case, d.name, value)
+            changed = True
+        case.Formelversionen[d.name] = d.version
+    return changed
+
+
+def apply_derivations(case: StudyCase, changed_inputs=None) -> StudyCase:
+    """Abgeleitete Felder eines Falls berechnen (beim Speichern).
+
+    Mit ``changed_inputs`` werden nur die davon abhängigen Felder berechnet.
+    """
+    names = _REGISTRY.keys() if changed_inputs is None else affected(set(changed_inputs))
+    _compute(case, set(names))
+    return case
+
+
+def recompute_store(cases: dict) -> tuple:
+    """Veraltete Ableitungen im gesamten Fallbestand neu berechnen.
+
+    Fälle mit identischem Versionsstand werden gruppiert, damit die Menge der
+    betroffenen Felder nur einmal pro Gruppe bestimmt wird. Gibt
+    ``(IDs der neu berechneten Fälle, {Feld: Anzahl geänderter Werte})``
+    zurück. Neu berechnete Fälle müssen auch dann gespeichert werden, wenn
+    sich kein Wert geändert hat – ihre ``Formelversionen`` sind neu.
+    """
+    versions = current_versions()
+    stale_by_signature = {}
+    touched, stats = [], {}
+    for sid, case in cases.items():
+        signature = tuple(sorted(case.Formelversionen.items()))
+        stale = stale_by_signature.get(signature)
+        if stale is None:
+            outdated = {n for n, v in versions.items() if case.Formelversionen.get(n) != v}
+            stale = affected(outdated) if outdated else set()
+            stale_by_signature[signature] = stale
+        if not stale:
+            continue
+        before = {n: getattr(case, n) for n in stale}
+        _compute(case, stale)
+        touched.append(sid)
+        for n in stale:
+            if getattr(case, n) != before[n]:
+                stats[n] = stats.get(n, 0) + 1
+    return touched, stats
+
+
+# ---------------------------------------------------------
+# Formeln
+# ---------------------------------------------------------
+@derived("BMI", inputs=("Koerpergroesse_cm", "Koerpergewicht_kg"), version=1)
+def bmi(height_cm, weight_kg):
+    return round(weight_kg / (height_cm / 100) ** 2, 1)
+
+
+@derived("ECMO_Dauer_Tage", inputs=("Datum_VA_Implantation", "Datum_ECMO_Explantation"), version=1)
+def ecmo_duration_days(implant, explant):
+    days = (date.fromisoformat(explant) - date.fromisoformat(implant)).days
+    return days if days >= 0 else None
+
+
+# ---------------------------------------------------------
+# 30CERW-Score (konfigurierbare Punktetabelle)
+# ---------------------------------------------------------
+# Die Punktetabelle des Studienprotokolls liegt noch nicht vor. Bis dahin
+# gilt eine vorläufige Tabelle, die als Platzhalter gekennzeichnet ist;
+# ``data/score_30cerw.json`` ersetzt sie vollständig (gleiches Format). Nach
+# einer Änderung ``version`` hochzählen und die App neu starten – die
+# Schaltfläche „Abgeleitete Felder neu berechnen“ aktualisiert dann alle Fälle.
+#
+# Je Eintrag zählt die erste zutreffende Regel:
+#   "schwellen": [[Operator, Grenzwert, Punkte], ...]
+#   "werte":     {Feldwert: Punkte}
+# "kategorien": [[höchster Score, Kategorie], ..., [null, Kategorie]]
+SCORE_FILE = DATA_DIR / "score_30cerw.json"
+
+DEFAULT_SCORE_CONFIG = {
+    "version": 1,
+    "platzhalter": True,
+    "quelle": "vorläufig, nicht validiert – keine Quelle",
+    "punkte": [
+        {"feld": "Alter", "schwellen": [[">=", 65, 2], [">=", 50, 1]]},
+        {"feld": "BMI", "schwellen": [[">=", 35, 1]]},
+        {"feld": "Reanimation_vor_ECMO", "werte": {"ja": 1}},
+        {"feld": "Reanimationsdauer", "werte": {"> 30 min": 2}},
+        {"feld": "ECPR", "werte": {"ja": 2}},
+        {"feld": "Beatmungsdauer_Kat", "werte": {"> 7 Tage": 1}},
+        {"feld": "Hauptdiagnose", "werte": {"Postkardiotomie Schock": 1}},
+        {"feld": "Chronische_Niereninsuffizienz", "werte": {"ja": 1}},
+        {"feld": "Lebererkrankungen", "werte": {"ja": 1}},
+        {"feld": "COPD", "werte": {"ja": 1}},
+        {"feld": "pH", "schwellen": [["<", 7.2, 2], ["<", 7.3, 1]]},
+        {"feld": "Laktat", "schwellen": [[">", 8, 3], [">", 4, 2], [">", 2, 1]]},
+        {"feld": "Kreatinin", "schwellen": [[">", 2.0, 1]]},
+        {"feld": "Bilirubin", "schwellen": [[">", 2.0, 1]]},
+        {"feld": "MAP_mmHg", "schwellen": [["<", 60, 1]]},
+        {
+            "feld": "Noradrenalin_Aequivalent_g_pro_kgKG_min",
+            "schwellen": [[">", 0.3, 2], [">", 0.1, 1]],
+        },
+    ],
+    "kategorien": [[5, "niedrig"], [10, "mittel"], [None, "hoch"]],
+}
+
+_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def load_score_config() -> dict:
+    """Punktetabelle aus ``score_30cerw.json`` (sonst Platzhalter) prüfen und liefern."""
+    if SCORE_FILE.exists():
+        with open(SCORE_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    else:
+        config = DEFAULT_SCORE_CONFIG
+    for item in config["punkte"]:
+        if item["feld"] not in StudyCase.__dataclass_fields__:
+            raise ValueError(f"Unbekanntes Feld in der 30CERW-Punktetabelle: {item['feld']}")
+        for op, _, _ in item.get("schwellen", []):
+            if op not in _OPS:
+                raise ValueError(f"Ungültiger Operator in der 30CERW-Punktetabelle: {op}")
+    if not config["kategorien"] or config["kategorien"][-1][0] is not None:
+        raise ValueError("Die letzte 30CERW-Kategorie braucht die Obergrenze null")
+    return config
+
+
+SCORE_CONFIG = load_score_config()
+
+
+def score_is_placeholder() -> bool:
+    return bool(SCORE_CONFIG.get("platzhalter"))
+
+
+def _points(item: dict, value) -> int:
+    if "werte" in item:
+        return item["werte"].get(value, 0)
+    for op, limit, points in item["schwellen"]:
+        if _OPS[op](value, limit):
+            return points
+    return 0
+
+
+@derived(
+    "Score_30CERW",
+    inputs=tuple(item["feld"] for item in SCORE_CONFIG["punkte"]),
+    version=SCORE_CONFIG["version"],
+)
+def score_30cerw(*values):
+    # Höhere Punktzahl = ungünstigere Ausgangslage
+    return sum(_points(item, v) for item, v in zip(SCORE_CONFIG["punkte"], values))
+
+
+@derived("Risikokategorie_30CERW", inputs=("Score_30CERW",), version=SCORE_CONFIG["version"])
+def risk_category(score):
+    for limit, category in SCORE_CONFIG["kategorien"]:
+        if limit is None or score <= limit:
+            return category
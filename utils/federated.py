@@ -0,0 +1,138 @@
+"""Zentrumsübergreifende (föderierte) Abfragen für Administratoren.
+
+Jedes Zentrum hat eine eigene Datenpartition (``data/zentren/<zentrum>/``,
+siehe ``utils.storage``). ``fan_out`` führt eine Abfrage in jeder Partition
+parallel aus – jeweils in einem eigenen Kontext, sodass die Partition der
+aufrufenden Sitzung unberührt bleibt – und sammelt die Ergebnisse je
+Partition. Ein beschädigter Bestand eines Zentrums bricht die Abfrage nicht
+ab, sondern wird unter ``errors`` gemeldet.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import archive, derived, reports, storage
+
+DEFAULT_LABEL = "(ohne Zentrum)"
+
+
+def label(partition) -> str:
+    return DEFAULT_LABEL if partition is None else partition
+
+
+def _in_partition(partition, fn):
+    storage.use_partition(partition)
+    return fn()
+
+
+def fan_out(fn, partitions=None, max_workers=None) -> tuple:
+    """``fn()`` in jeder Partition parallel ausführen.
+
+    Gibt ``(Ergebnisse, Fehler)`` zurück, beide als Dict
+    ``{Partition: Wert}``; ``None`` steht für den gemeinsamen Bestand.
+    """
+    partitions = storage.list_partitions() if partitions is None else partitions
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            p: pool.submit(contextvars.Context().run, _in_partition, p, fn)
+            for p in partitions
+        }
+    results, errors = {}, {}
+    for p, future in futures.items():
+        try:
+            results[p] = future.result()
+        except (storage.StorageError, archive.ArchiveError, OSError) as e:
+            errors[p] = str(e)
+    return results, errors
+
+
+# ---------------------------------------------------------
+# Abfragen (laufen innerhalb einer Partition)
+# ---------------------------------------------------------
+def partition_summary() -> dict:
+    """Kennzahlen der aktiven Partition."""
+    patients = storage.load_patients()
+    cases = storage.load_cases()
+    archived = [p for p in patients.values() if p.archiv is not None]
+    risk = [c.Risikokategorie_30CERW for c in cases.values()]
+    scores = [c.Score_30CERW for c in cases.values() if c.Score_30CERW is not None]
+    return {
+        "Patienten": len(patients),
+        "Aktiv": len(patients) - len(archived),
+        "Archiviert": len(archived),
+        "Messungen": sum(
+            len(p.verlauf) if p.archiv is None else p.archiv["messungen"]
+            for p in patients.values()
+        ),
+        "Offene Alarme": sum(
+            1 for p in patients.values() for a in p.alerts if not a.quittiert
+        ),
+        "30CERW-Fälle": len(cases),
+        "Ø 30CERW-Score": round(sum(scores) / len(scores), 1) if scores else None,
+        "Risiko niedrig": risk.count("niedrig"),
+        "Risiko mittel": risk.count("mittel"),
+        "Risiko hoch": risk.count("hoch"),
+    }
+
+
+def case_rows() -> list:
+    """Alle 30CERW-Fälle der aktiven Partition als flache Zeilen."""
+    cases = storage.load_cases()
+    versions = derived.current_versions()
+    stale = {
+        sid for sid, c in cases.items()
+        if any(c.Formelversionen.get(n) != v for n, v in versions.items())
+    }
+    rows = []
+    for sid, case in cases.items():
+        row = {"Studien-ID": sid, **case.to_dict()}
+        row.pop("Formelversionen")
+        row["Formel veraltet"] = sid in stale
+        rows.append(row)
+    return rows
+
+
+def cohort_rows(include_archived: bool = False):
+    """Alle Messungen der aktiven Partition (wie ``reports.cohort_dataframe``)."""
+    patients = storage.load_patients()
+    if include_archived:
+        patients = archive.with_archived(patients)
+    else:
+        patients = {pid: p for pid, p in patients.items() if p.archiv is None}
+    return reports.cohort_dataframe(patients)
+
+
+# ---------------------------------------------------------
+# Zusammenführen
+# ---------------------------------------------------------
+def summary(max_workers=None):
+    """Kennzahlen aller Zentren als DataFrame (eine Zeile je Zentrum)."""
+    import pandas as pd
+
+    results, errors = fan_out(partition_summary, max_workers=max_workers)
+    df = pd.DataFrame(
+        [{"Zentrum": label(p), **row} for p, row in results.items()]
+    )
+    return df, {label(p): e for p, e in errors.items()}
+
+
+def all_cases(max_workers=None):
+    """30CERW-Fälle aller Zentren mit Spalte ``Zentrum``."""
+    import pandas as pd
+
+    results, errors = fan_out(case_rows, max_workers=max_workers)
+    df = pd.DataFrame(
+        [{"Zentrum": label(p), **row} for p, rows in results.items() for row in rows]
+    )
+    return df, {label(p): e for p, e in errors.items()}
+
+
+def all_measurements(include_archived: bool = False, max_workers=None):
+    """Messungen aller Zentren mit Spalte ``Zentrum``."""
+    import pandas as pd
+
+    results, errors = fan_out(
+        lambda: cohort_rows(include_archived), max_workers=max_workers
+    )
+    frames = [df.assign(Zentrum=label(p)) for p, df in results.items() if not df.empty]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return df, {label(p): e for p, e in errors.items()}
@@ -0,0 +1,380 @@
+"""Zusammenführen von 30CERW-Falldateien mehrerer Zentren.
+
+Die Eingabedateien haben das Format von ``study_30cerw_cases.json``
+(``{Studien-ID: Fall}``). Sie werden eintragsweise gestreamt und in eine
+SQLite-Datenbank übernommen, sodass der Speicherbedarf unabhängig von der
+Gesamtzahl der Fälle bleibt:
+
+- identische Fälle (gleicher Inhalts-Hash) werden nur einmal übernommen,
+- abweichende Fälle mit gleicher Studien-ID werden als Konflikt mit
+  feldweisem Diff protokolliert; der zuerst gelesene Fall bleibt erhalten,
+- ungültige Fälle werden übersprungen und im Fehlerprotokoll vermerkt,
+- eine Datei, die nicht vollständig gelesen werden kann, wird komplett
+  verworfen (eigener Savepoint je Datei) – es gibt keine Teilimporte.
+
+Aufruf aus dem Projektverzeichnis:
+
+    python -m utils.merge ZIEL.json zentrum_a.json zentrum_b.json ...
+
+Jeder Lauf beginnt mit einer leeren temporären Datenbank. Nur mit
+``--db PFAD`` wird eine Arbeitsdatenbank behalten und beim nächsten Lauf
+weiterverwendet, etwa um ein weiteres Zentrum nachzuladen.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+
+from utils.records import StudyCase, ValidationError
+
+CHUNK_SIZE = 1 << 20
+BATCH_SIZE = 5000
+# Schutz vor unbegrenztem Nachladen bei kaputten Dateien
+MAX_ENTRY_SIZE = 64 << 20
+MAX_PRINTED_ERRORS = 20
+
+_decoder = json.JSONDecoder()
+_WS = " \t\n\r"
+_DELIM = _WS + ",:}"
+
+
+class MergeError(Exception):
+    """Eine Eingabedatei kann nicht gelesen werden."""
+
+
+# ---------------------------------------------------------
+# Streaming-Leser
+# ---------------------------------------------------------
+def iter_entries(path: Path, chunk_size: int = CHUNK_SIZE):
+    """Einträge ``(Schlüssel, Wert)`` eines JSON-Objekts nacheinander liefern.
+
+    Es wird immer nur der aktuelle Eintrag plus ein Lesepuffer im Speicher
+    gehalten.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                fill()
+
+        def expect(char):
+            nonlocal pos
+            skip_ws()
+            if pos >= len(buf) or buf[pos] != char:
+                found = buf[pos:pos + 20] if pos < len(buf) else "Dateiende"
+                raise MergeError(f"{path}: '{char}' erwartet, gefunden {found!r}")
+            pos += 1
+
+        def value():
+            nonlocal pos
+            skip_ws()
+            while True:
+                try:
+                    obj, end = _decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError as e:
+                    if eof or len(buf) - pos > MAX_ENTRY_SIZE:
+                        raise MergeError(f"{path}: ungültiges JSON ({e})") from None
+                    fill()
+                    continue
+                # Zahlen am Pufferende könnten abgeschnitten sein ("-1" von "-1.5")
+                if not eof and (end == len(buf) or buf[end] not in _DELIM):
+                    if len(buf) - pos > MAX_ENTRY_SIZE:
+                        raise MergeError(f"{path}: ungültiges JSON an Position {end}")
+                    fill()
+                    continue
+                pos = end
+                return obj
+
+        fill()
+        expect("{")
+        skip_ws()
+        if pos < len(buf) and buf[pos] == "}":
+            return
+        while True:
+            key = value()
+            if not isinstance(key, str):
+                raise MergeError(f"{path}: Schlüssel erwartet")
+            expect(":")
+            yield key, value()
+            skip_ws()
+            if pos < len(buf) and buf[pos] == ",":
+                pos += 1
+                continue
+            expect("}")
+            return
+
+
+# ---------------------------------------------------------
+# Vergleich
+# ---------------------------------------------------------
+def canonical_json(case: dict) -> str:
+    """Kompakte JSON-Darstellung mit sortierten Schlüsseln (Basis des Hashs)."""
+    return json.dumps(case, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def content_hash(canonical: str) -> str:
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def field_diff(old: dict, new: dict) -> dict:
+    """Abweichende Felder als ``{Feld: [alt, neu]}``."""
+    return {
+        key: [old.get(key), new.get(key)]
+        for key in sorted(old.keys() | new.keys())
+        if old.get(key) != new.get(key)
+    }
+
+
+# ---------------------------------------------------------
+# Konsolidierter Speicher
+# ---------------------------------------------------------
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    studien_id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    source TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conflicts (
+    studien_id TEXT NOT NULL,
+    kept_source TEXT NOT NULL,
+    source TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    diff TEXT NOT NULL,
+    UNIQUE (studien_id, hash)
+);
+CREATE TABLE IF NOT EXISTS errors (
+    source TEXT NOT NULL,
+    studien_id TEXT,
+    message TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class MergeStats:
+    files: int = 0
+    read: int = 0
+    added: int = 0
+    duplicates: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    failed_files: list = field(default_factory=list)
+
+
+def _flush(con: sqlite3.Connection, batch: list, stats: MergeStats):
+    """Einen Block von Fällen gegen den Speicher abgleichen."""
+    ids = list({item[0] for item in batch})
+    existing = {}
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        rows = con.execute(
+            f"SELECT studien_id, hash, source, data FROM cases "
+            f"WHERE studien_id IN ({','.join('?' * len(part))})",
+            part,
+        )
+        for sid, h, src, data in rows:
+            existing[sid] = (h, src, data)
+
+    inserts = []
+    conflicts = []
+    for sid, h, source, data in batch:
+        if sid not in existing:
+            existing[sid] = (h, source, data)
+            inserts.append((sid, h, source, data))
+            stats.added += 1
+        elif existing[sid][0] == h:
+            stats.duplicates += 1
+        else:
+            _, kept_source, kept_data = existing[sid]
+            diff = field_diff(json.loads(kept_data), json.loads(data))
+            conflicts.append((sid, kept_source, source, h, json.dumps(diff, ensure_ascii=False)))
+
+    con.executemany("INSERT INTO cases VALUES (?, ?, ?, ?)", inserts)
+    cur = con.executemany("INSERT OR IGNORE INTO conflicts VALUES (?, ?, ?, ?, ?)", conflicts)
+    stats.conflicts += cur.rowcount if cur.rowcount > 0 else 0
+    batch.clear()
+
+
+def merge_files(files, db_path: Path, stats: MergeStats = None) -> MergeStats:
+    """Falldateien in die Datenbank ``db_path`` übernehmen.
+
+    Kann mehrfach mit derselben Datenbank aufgerufen werden, um weitere
+    Zentren nachzuladen.
+    """
+    stats = stats or MergeStats()
+    # Autocommit; Transaktionen werden über Savepoints selbst gesteuert
+    con = sqlite3.connect(db_path, isolation_level=None)
+    con.executescript(_SCHEMA)
+    try:
+        for path in files:
+            path = Path(path)
+            stats.files += 1
+            # voller Pfad: alle Zentren nennen ihre Datei study_30cerw_cases.json
+            source = str(path)
+            batch = []
+            before = replace(stats, failed_files=stats.failed_files)
+            con.execute("SAVEPOINT datei")
+            try:
+                for key, raw in iter_entries(path):
+                    stats.read += 1
+                    try:
+                        case = StudyCase.from_dict(raw, key)
+                    except ValidationError as e:
+                        stats.invalid += 1
+                        con.execute("INSERT INTO errors VALUES (?, ?, ?)", (source, key, str(e)))
+                        continue
+                    if case.Studien_ID != key:
+                        stats.invalid += 1
+                        con.execute(
+                            "INSERT INTO errors VALUES (?, ?, ?)",
+                            (source, key, f"Schlüssel passt nicht zur Studien-ID {case.Studien_ID!r}"),
+                        )
+                        continue
+                    data = canonical_json(case.to_dict())
+                    batch.append((key, content_hash(data), source, data))
+                    if len(batch) >= BATCH_SIZE:
+                        _flush(con, batch, stats)
+                if batch:
+                    _flush(con, batch, stats)
+            except (MergeError, OSError, UnicodeDecodeError) as e:
+                # bereits übernommene Fälle dieser Datei verwerfen
+                con.execute("ROLLBACK TO datei")
+                con.execute("RELEASE datei")
+                for f in fields(MergeStats):
+                    if f.name not in ("files", "failed_files"):
+                        setattr(stats, f.name, getattr(before, f.name))
+                stats.failed_files.append(source)
+                con.execute(
+                    "INSERT INTO errors VALUES (?, ?, ?)",
+                    (source, None, f"Datei nicht übernommen: {e}"),
+                )
+                continue
+            con.execute("RELEASE datei")
+    finally:
+        con.close()
+    return stats
+
+
+def export_cases(db_path: Path, out_path: Path):
+    """Konsolidierte Fälle streamend als ``{Studien-ID: Fall}`` schreiben."""
+    con = sqlite3.connect(db_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("{")
+            first = True
+            for sid, data in con.execute("SELECT studien_id, data FROM cases ORDER BY studien_id"):
+                if not first:
+                    f.write(",")
+                f.write(json.dumps(sid, ensure_ascii=False))
+                f.write(":")
+                f.write(data)
+                first = False
+            f.write("}")
+        os.replace(tmp, out_path)
+    finally:
+        con.close()
+
+
+def iter_conflicts(db_path: Path):
+    """Protokollierte Konflikte als Dicts liefern."""
+    con = sqlite3.connect(db_path)
+    try:
+        for sid, kept, source, _, diff in con.execute(
+            "SELECT * FROM conflicts ORDER BY studien_id, source"
+        ):
+            yield {
+                "Studien_ID": sid,
+                "behalten_aus": kept,
+                "abweichend_in": source,
+                "diff": json.loads(diff),
+            }
+    finally:
+        con.close()
+
+
+def iter_errors(db_path: Path):
+    """Protokollierte Fehler (ungültige Fälle, unlesbare Dateien) als Dicts liefern."""
+    con = sqlite3.connect(db_path)
+    try:
+        for source, sid, message in con.execute("SELECT * FROM errors ORDER BY rowid"):
+            yield {"Datei": source, "Studien_ID": sid, "Fehler": message}
+    finally:
+        con.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="30CERW-Falldateien mehrerer Zentren zusammenführen")
+    parser.add_argument("out", type=Path, help="Ziel-JSON (Format wie study_30cerw_cases.json)")
+    parser.add_argument("files", nargs="+", type=Path, help="Eingabedateien der Zentren")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        help="Arbeitsdatenbank weiterverwenden, um Zentren nachzuladen "
+        "(Standard: neue temporäre Datenbank je Lauf)",
+    )
+    parser.add_argument("--conflicts", type=Path, help="Konflikte zusätzlich als JSON-Lines schreiben")
+    parser.add_argument(
+        "--errors",
+        type=Path,
+        help="Ungültige Fälle und unlesbare Dateien als JSON-Lines schreiben "
+        "(sonst werden die ersten Fehler ausgegeben)",
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or Path(tmp) / "merge.sqlite"
+        stats = merge_files(args.files, db_path)
+        export_cases(db_path, args.out)
+
+        if args.conflicts:
+            with open(args.conflicts, "w", encoding="utf-8") as f:
+                for item in iter_conflicts(db_path):
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+        if args.errors:
+            with open(args.errors, "w", encoding="utf-8") as f:
+                for item in iter_errors(db_path):
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        else:
+            errors = iter_errors(db_path)
+            for i, item in enumerate(errors):
+                if i == MAX_PRINTED_ERRORS:
+                    print("… weitere Fehler mit --errors DATEI vollständig ausgeben")
+                    errors.close()
+                    break
+                where = f"{item['Datei']} [{item['Studien_ID']}]" if item["Studien_ID"] else item["Datei"]
+                print(f"Fehler: {where}: {item['Fehler']}")
+
+    print(
+        f"{stats.files} Dateien, {stats.read} Fälle gelesen: {stats.added} übernommen, "
+        f"{stats.duplicates} Duplikate, {stats.conflicts} Konflikte, {stats.invalid} ungültig"
+    )
+    if stats.failed_files:
+        print("Nicht lesbar (nicht übernommen):", ", ".join(stats.failed_files))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+from dataclasses import MISSING, dataclass, field, fields
+from datetime import date, datetime
+from types import UnionType
+from typing import Literal, Union, get_args, get_origin, get_type_hints
+
+# ---------------------------------------------------------
+# Typisierte Datensätze für Patienten, Messungen und 30CERW-Fälle
+# ---------------------------------------------------------
+# Die Attributnamen entsprechen exakt den JSON-Schlüsseln, damit die
+# gespeicherten Dateien unverändert gelesen werden können.
+
+JA_NEIN = Literal["-", "ja", "nein"]
+GESCHLECHT = Literal["-", "w", "m", "divers"]
+DAUER_REA = Literal["-", "< 30 min", "> 30 min"]
+DAUER_BEATMUNG = Literal["-", "< 7 Tage", "> 7 Tage"]
+HAUPTDIAGNOSE = Literal[
+    "-",
+    "Kardiogener Schock",
+    "Postkardiotomie Schock",
+    "Gemischter Schock",
+]
+URSACHE = Literal[
+    "-",
+    "AMI (STEMI / NSTEMI)",
+    "Dilatative Kardiomyopathie",
+    "Akute Herzinsuffizienz",
+    "Myokarditis",
+    "Post-OP",
+    "Sonstiges",
+]
+
+
+def choices(literal) -> list:
+    """Auswahlwerte eines Literal-Typs, z.B. für ``st.selectbox``."""
+    return list(get_args(literal))
+
+
+class ValidationError(ValueError):
+    """Ein gespeicherter Datensatz entspricht nicht dem erwarteten Schema."""
+
+    def __init__(self, msg: str, loc: str = ""):
+        super().__init__(f"{loc}: {msg}" if loc else msg)
+        self.msg = msg
+        self.loc = loc
+
+    def at(self, prefix: str) -> "ValidationError":
+        """Fehler mit vorangestelltem Pfad (z.B. ``Patient.verlauf[3]``)."""
+        return ValidationError(self.msg, prefix + self.loc)
+
+
+# ---------------------------------------------------------
+# Konverter (werden pro Klasse einmalig aus den Typangaben gebaut)
+# ---------------------------------------------------------
+# Der Fehlerpfad wird erst im Fehlerfall zusammengesetzt, damit gültige
+# Daten ohne zusätzliche String-Operationen pro Feld dekodiert werden.
+def _conv_float(value):
+    if type(value) is float:
+        return value
+    if type(value) is int:
+        return float(value)
+    raise ValidationError(f"Zahl erwartet, erhalten {value!r}")
+
+
+def _conv_int(value):
+    if type(value) is int:
+        return value
+    if type(value) is float and value.is_integer():
+        return int(value)
+    raise ValidationError(f"Ganzzahl erwartet, erhalten {value!r}")
+
+
+def _conv_bool(value):
+    if type(value) is bool:
+        return value
+    raise ValidationError(f"true/false erwartet, erhalten {value!r}")
+
+
+def _conv_any(value):
+    # beliebiger JSON-Wert (z.B. interner Zustand der Alarmregeln)
+    return value
+
+
+def _conv_str(value):
+    if type(value) is str:
+        return value
+    raise ValidationError(f"Text erwartet, erhalten {value!r}")
+
+
+def _conv_date(value):
+    try:
+        date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"Datum (JJJJ-MM-TT) erwartet, erhalten {value!r}") from None
+    return value
+
+
+def _conv_timestamp(value):
+    try:
+        datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"Zeitstempel erwartet, erhalten {value!r}") from None
+    return value
+
+
+def _conv_literal(allowed):
+    allowed = frozenset(allowed)
+
+    def conv(value):
+        # Listen/Objekte sind nicht hashbar und können kein Auswahlwert sein
+        if isinstance(value, (str, int, float, bool)) and value in allowed:
+            return value
+        raise ValidationError(f"ungültiger Wert {value!r}")
+
+    return conv
+
+
+def _conv_optional(inner):
+    def conv(value):
+        return None if value is None else inner(value)
+
+    return conv
+
+
+def _conv_dict(key_conv, value_conv):
+    def conv(value):
+        if type(value) is not dict:
+            raise ValidationError("Objekt erwartet")
+        out = {}
+        for k, v in value.items():
+            try:
+                out[key_conv(k)] = value_conv(v)
+            except ValidationError as e:
+                raise e.at(f"[{k!r}]") from None
+        return out
+
+    return conv
+
+
+def _conv_list(item_cls):
+    def conv(value):
+        if type(value) is not list:
+            raise ValidationError("Liste erwartet")
+        decode = item_cls.from_dict
+        out = []
+        for i, v in enumerate(value):
+            try:
+                out.append(decode(v, ""))
+            except ValidationError as e:
+                raise e.at(f"[{i}]") from None
+        return out
+
+    return conv
+
+
+# Markierungen für Textfelder mit Formatprüfung
+class IsoDate(str):
+    pass
+
+
+class IsoTimestamp(str):
+    pass
+
+
+_SIMPLE = {
+    float: _conv_float,
+    int: _conv_int,
+    str: _conv_str,
+    bool: _conv_bool,
+    object: _conv_any,
+    IsoDate: _conv_date,
+    IsoTimestamp: _conv_timestamp,
+}
+
+
+def _converter(tp):
+    if tp in _SIMPLE:
+        return _SIMPLE[tp]
+    origin = get_origin(tp)
+    if origin is Literal:
+        return _conv_literal(get_args(tp))
+    if origin is list:
+        return _conv_list(get_args(tp)[0])
+    if origin is dict:
+        key_tp, value_tp = get_args(tp)
+        return _conv_dict(_converter(key_tp), _converter(value_tp))
+    if origin in (Union, UnionType):
+        args = [a for a in get_args(tp) if a is not type(None)]
+        if len(args) == 1:
+            return _conv_optional(_converter(args[0]))
+    raise TypeError(f"Kein Konverter für Typ {tp!r}")
+
+
+class Record:
+    """Basisklasse: validiertes Lesen/Schreiben aus bzw. in JSON-Dicts."""
+
+    __slots__ = ()
+    _schema = None
+
+    @classmethod
+    def _build_schema(cls):
+        hints = get_type_hints(cls)
+        schema = []
+        for f in fields(cls):
+            required = f.default is MISSING and f.default_factory is MISSING
+            schema.append((f.name, _converter(hints[f.name]), required))
+        cls._schema = tuple(schema)
+        cls._names = frozenset(f.name for f in fields(cls))
+        return cls._schema
+
+    @classmethod
+    def from_dict(cls, data, path=None):
+        """Datensatz aus einem JSON-Dict lesen und dabei validieren."""
+        path = cls.__name__ if path is None else path
+        if type(data) is not dict:
+            raise ValidationError("Objekt erwartet", path)
+        schema = cls.__dict__.get("_schema") or cls._build_schema()
+        if not data.keys() <= cls._names:
+            unknown = sorted(data.keys() - cls._names)
+            raise ValidationError(f"unbekannte Felder {unknown}", path)
+        kwargs = {}
+        for name, conv, required in schema:
+            if name in data:
+                try:
+                    kwargs[name] = conv(data[name])
+                except ValidationError as e:
+                    raise e.at(f"{path}.{name}") from None
+            elif required:
+                raise ValidationError(f"Pflichtfeld '{name}' fehlt", path)
+        return cls(**kwargs)
+
+    def to_dict(self) -> dict:
+        schema = type(self).__dict__.get("_schema") or type(self)._build_schema()
+        out = {}
+        for name, _, _ in schema:
+            value = getattr(self, name)
+            if type(value) is list:
+                value = [v.to_dict() if isinstance(v, Record) else v for v in value]
+            elif type(value) is dict:
+                value = dict(value)
+            out[name] = value
+        return out
+
+
+# ---------------------------------------------------------
+# Datensätze
+# ---------------------------------------------------------
+@dataclass(slots=True)
+class Measurement(Record):
+    """Eine gespeicherte Messung aus dem Weaning-Tool."""
+
+    timestamp: IsoTimestamp
+    MAP: float
+    HR: float
+    Vasopressor: float
+    ECMO_Flow: float
+    Sweep: float
+    ECMO_FiO2: float
+    Vent_FiO2: float
+    PEEP: float
+    DP: float
+    Laktat: float
+    pH: float
+    PaO2: float
+    Organ: float
+    Echo: float
+    score: float
+    # Monte-Carlo-Unsicherheitsbereich (siehe utils/uncertainty.py)
+    unsicherheit: dict[str, float] | None = None
+
+
+@dataclass(slots=True)
+class Alert(Record):
+    """Ein ausgelöster Frühwarn-Alarm (siehe utils/alerts.py)."""
+
+    timestamp: IsoTimestamp
+    regel: str
+    text: str
+    quittiert: bool = False
+
+
+@dataclass(slots=True)
+class Patient(Record):
+    """Patient mit Stammdaten und Messverlauf (Schlüssel = Patienten-ID)."""
+
+    name: str = ""
+    age: int = 0
+    diagnose: str = ""
+    verlauf: list[Measurement] = field(default_factory=list)
+    alerts: list[Alert] = field(default_factory=list)
+    # inkrementeller Zustand der Alarmregeln je Regel-ID
+    alert_state: dict[str, object] = field(default_factory=dict)
+    # Datum der ECMO-Explantation (abgeschlossener Lauf)
+    explantiert: IsoDate | None = None
+    # Verweis auf das Archivsegment, falls ausgelagert (siehe utils/archive.py)
+    archiv: dict[str, object] | None = None
+
+
+@dataclass(slots=True)
+class StudyCase(Record):
+    """Ein Fall des 30CERW-Datenerhebungsbogens (Schlüssel = Studien-ID)."""
+
+    Studien_ID: str
+    Zentrum: str
+    Datum_VA_Implantation: IsoDate
+    Geschlecht: GESCHLECHT
+    Alter: int
+    Koerpergroesse_cm: int
+    Koerpergewicht_kg: float
+    BMI: float
+    # Reanimation
+    Reanimation_vor_ECMO: JA_NEIN
+    Reanimationsdauer: DAUER_REA
+    ECPR: JA_NEIN
+    # Beatmung / ICU
+    Mechanische_Beatmung_prae: JA_NEIN
+    Beatmungsdauer_Kat: DAUER_BEATMUNG
+    ICU_Aufenthalt_prae_Tage: int
+    # Diagnose
+    Hauptdiagnose: HAUPTDIAGNOSE
+    Ursache: URSACHE
+    Ursache_sonstiges: str
+    # Vorerkrankungen
+    COPD: JA_NEIN
+    Chronische_Niereninsuffizienz: JA_NEIN
+    KHK: JA_NEIN
+    Kardiomyopathie: JA_NEIN
+    Lebererkrankungen: JA_NEIN
+    Diabetes_mellitus: JA_NEIN
+    Zerebrovaskulaere_Vorerkrankungen: JA_NEIN
+    Weitere_Vorerkrankungen: str
+    # Labor
+    pH: float
+    Laktat: float
+    BE: float
+    Kreatinin: float
+    Bilirubin: float
+    PaO2_mmHg: float
+    # Kreislauf
+    MAP_mmHg: int
+    Vasopressor_erforderlich: JA_NEIN
+    Noradrenalin_Aequivalent_g_pro_kgKG_min: float
+    Mechanische_Beatmung_aktuell: JA_NEIN
+    # Endpunkte
+    Ueberleben_30Tage: JA_NEIN
+    ECMO_Weaning_erfolgreich: JA_NEIN
+    Datum_ECMO_Explantation: IsoDate
+    Weaning_Definition_intern: str
+    # Abgeleitete Felder (siehe utils/derived.py)
+    ECMO_Dauer_Tage: int | None = None
+    Score_30CERW: int | None = None
+    Risikokategorie_30CERW: str = ""
+    Formelversionen: dict[str, int] = field(default_factory=dict)
@@ -0,0 +1,383 @@
+import hashlib
+import html
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from utils import storage
+from utils.records import Patient
+
+# ---------------------------------------------------------
+# Berichte & Exporte für Weaning-Verläufe
+# ---------------------------------------------------------
+# Berichte liegen unter ``reports/`` der aktiven Datenpartition
+REPORT_DIR = "reports"
+
+# Bei Layout-Änderungen hochzählen -> alte Berichte im Cache werden ignoriert
+REPORT_VERSION = 1
+
+TREND_PARAMS = [
+    ("MAP", "MAP (mmHg)"),
+    ("HR", "Herzfrequenz (/min)"),
+    ("Vasopressor", "Vasopressoren (0–10)"),
+    ("ECMO_Flow", "ECMO-Flow (L/min)"),
+    ("Sweep", "Sweep-Gas (L/min)"),
+    ("ECMO_FiO2", "ECMO FiO₂"),
+    ("Vent_FiO2", "Beatmungs-FiO₂"),
+    ("PEEP", "PEEP (cmH₂O)"),
+    ("DP", "Driving Pressure (cmH₂O)"),
+    ("Laktat", "Laktat (mmol/l)"),
+    ("pH", "pH"),
+    ("PaO2", "PaO₂ (mmHg)"),
+    ("Organ", "Organfunktion (0–10)"),
+    ("Echo", "Echo-Score (0–10)"),
+]
+
+LAST_MEASUREMENTS = 5
+
+
+def pdf_available() -> bool:
+    """PDF-Berichte benötigen matplotlib (optional)."""
+    try:
+        import matplotlib  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# ---------------------------------------------------------
+# Cache
+# ---------------------------------------------------------
+def report_key(pat_id: str, patient: Patient) -> str:
+    """Cache-Schlüssel aus Patienten-ID und Zeitpunkt der letzten Messung.
+
+    Stammdaten fließen mit ein, damit eine Namens-/Altersänderung nicht den
+    alten Bericht ausliefert.
+    """
+    verlauf = patient.verlauf
+    last_ts = verlauf[-1].timestamp if verlauf else ""
+    raw = json.dumps(
+        [
+            REPORT_VERSION,
+            pat_id,
+            last_ts,
+            len(verlauf),
+            patient.name,
+            patient.age,
+            patient.diagnose,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _id_hash(pat_id: str) -> str:
+    return hashlib.sha1(pat_id.encode("utf-8")).hexdigest()[:16]
+
+
+def _cache_path(pat_id: str, key: str, fmt: str) -> Path:
+    # Hash statt bereinigter ID: "x/y" und "x_y" dürfen nicht kollidieren
+    return storage.data_dir() / REPORT_DIR / f"{_id_hash(pat_id)}-{key}.{fmt}"
+
+
+def _prune_old_reports(keep: Path):
+    """Ältere Berichte desselben Patienten im gleichen Format entfernen."""
+    prefix = keep.name.split("-", 1)[0]
+    for old in keep.parent.glob(f"{prefix}-*{keep.suffix}"):
+        if old != keep:
+            old.unlink(missing_ok=True)
+
+
+def report_filename(pat_id: str, fmt: str) -> str:
+    """Dateiname für Downloads und ZIP-Einträge (ohne Pfadtrenner).
+
+    Wurde die ID bereinigt, wird ein Kurz-Hash angehängt, damit verschiedene
+    IDs nicht denselben Namen erhalten.
+    """
+    safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in pat_id)
+    if safe_id != pat_id:
+        safe_id = f"{safe_id}-{_id_hash(pat_id)[:8]}"
+    return f"weaning_bericht_{safe_id}.{fmt}"
+
+
+# ---------------------------------------------------------
+# Diagramme (SVG ohne Zusatzbibliotheken)
+# ---------------------------------------------------------
+def _parse_ts(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _series(verlauf: list, key: str):
+    points = []
+    for m in verlauf:
+        ts = _parse_ts(m.timestamp)
+        if ts is not None:
+            points.append((ts, getattr(m, key)))
+    points.sort(key=lambda p: p[0])
+    return points
+
+
+def _svg_line_chart(points, title: str, width=640, height=200) -> str:
+    pad_l, pad_r, pad_t, pad_b = 48, 12, 24, 28
+    inner_w = width - pad_l - pad_r
+    inner_h = height - pad_t - pad_b
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="11">',
+        f'<text x="{pad_l}" y="15" font-weight="bold">{html.escape(title)}</text>',
+    ]
+    if not points:
+        parts.append(f'<text x="{pad_l}" y="{height / 2}">Keine Daten</text></svg>')
+        return "".join(parts)
+
+    t0 = points[0][0].timestamp()
+    t1 = points[-1][0].timestamp()
+    vals = [v for _, v in points]
+    v_min, v_max = min(vals), max(vals)
+    if v_max == v_min:
+        v_min -= 1
+        v_max += 1
+    t_span = (t1 - t0) or 1.0
+
+    def xy(ts, v):
+        x = pad_l + (ts.timestamp() - t0) / t_span * inner_w if t1 > t0 else pad_l + inner_w / 2
+        y = pad_t + (v_max - v) / (v_max - v_min) * inner_h
+        return x, y
+
+    coords = [xy(ts, v) for ts, v in points]
+    poly = " ".join(f"{x:.1f},{y:.1f}" for x, y in coords)
+
+    parts.append(
+        f'<rect x="{pad_l}" y="{pad_t}" width="{inner_w}" height="{inner_h}" '
+        f'fill="none" stroke="#ccc"/>'
+    )
+    parts.append(f'<text x="{pad_l - 4}" y="{pad_t + 4}" text-anchor="end">{v_max:g}</text>')
+    parts.append(f'<text x="{pad_l - 4}" y="{pad_t + inner_h}" text-anchor="end">{v_min:g}</text>')
+    parts.append(
+        f'<text x="{pad_l}" y="{height - 8}">{points[0][0]:%d.%m. %H:%M}</text>'
+        f'<text x="{pad_l + inner_w}" y="{height - 8}" text-anchor="end">'
+        f'{points[-1][0]:%d.%m. %H:%M}</text>'
+    )
+    parts.append(f'<polyline points="{poly}" fill="none" stroke="#c0392b" stroke-width="2"/>')
+    for x, y in coords:
+        parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="2.5" fill="#c0392b"/>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+# ---------------------------------------------------------
+# Berichtsformate
+# ---------------------------------------------------------
+def _html_report(pat_id: str, patient: Patient) -> bytes:
+    verlauf = patient.verlauf
+    esc = html.escape
+
+    rows = []
+    last = verlauf[-LAST_MEASUREMENTS:]
+    columns = ["timestamp", "score"] + [k for k, _ in TREND_PARAMS]
+    for m in reversed(last):
+        cells = "".join(f"<td>{esc(str(getattr(m, c)))}</td>" for c in columns)
+        rows.append(f"<tr>{cells}</tr>")
+    header = "".join(f"<th>{esc(c)}</th>" for c in columns)
+
+    trends = "".join(
+        f"<div class='chart'>{_svg_line_chart(_series(verlauf, key), label, 420, 160)}</div>"
+        for key, label in TREND_PARAMS
+    )
+
+    doc = f"""<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<title>Weaning-Bericht {esc(pat_id)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 24px; color: #222; }}
+table {{ border-collapse: collapse; font-size: 12px; }}
+th, td {{ border: 1px solid #ccc; padding: 3px 6px; text-align: right; }}
+.chart {{ display: inline-block; margin: 4px; }}
+.hint {{ color: #777; font-size: 12px; }}
+</style>
+</head>
+<body>
+<h1>Weaning-Bericht – {esc(pat_id)}</h1>
+<p><b>Fallbeschreibung:</b> {esc(patient.name)}<br>
+<b>Alter:</b> {patient.age} Jahre<br>
+<b>Diagnose:</b> {esc(patient.diagnose)}<br>
+<b>Anzahl Messungen:</b> {len(verlauf)}</p>
+<h2>Score-Verlauf</h2>
+{_svg_line_chart(_series(verlauf, "score"), "Weaning-Score (%)")}
+<h2>Parameterverläufe</h2>
+{trends}
+<h2>Letzte Messungen</h2>
+<table><tr>{header}</tr>{"".join(rows)}</table>
+<p class="hint">Studienprototyp – nicht validierte Demo-Berechnung, nicht zur klinischen
+Entscheidungsfindung geeignet. Erstellt am {datetime.now():%d.%m.%Y %H:%M}.</p>
+</body>
+</html>
+"""
+    return doc.encode("utf-8")
+
+
+def _pdf_report(pat_id: str, patient: Patient) -> bytes:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    verlauf = patient.verlauf
+    buf = io.BytesIO()
+    with PdfPages(buf) as pdf:
+        # Seite 1: Stammdaten, Score, letzte Messungen
+        fig = plt.figure(figsize=(8.27, 11.69))
+        fig.suptitle(f"Weaning-Bericht – {pat_id}", fontsize=14, fontweight="bold")
+        fig.text(
+            0.08, 0.92,
+            f"Fallbeschreibung: {patient.name}\n"
+            f"Alter: {patient.age} Jahre\n"
+            f"Diagnose: {patient.diagnose}\n"
+            f"Anzahl Messungen: {len(verlauf)}",
+            va="top", fontsize=10,
+        )
+        ax = fig.add_axes([0.1, 0.55, 0.8, 0.25])
+        pts = _series(verlauf, "score")
+        if pts:
+            ax.plot([p[0] for p in pts], [p[1] for p in pts], marker="o", color="#c0392b")
+        ax.set_title("Weaning-Score (%)")
+        ax.tick_params(axis="x", labelrotation=30, labelsize=7)
+
+        last = verlauf[-LAST_MEASUREMENTS:]
+        if last:
+            cols = ["timestamp", "score", "MAP", "ECMO_Flow", "Laktat", "pH", "PaO2"]
+            tab_ax = fig.add_axes([0.05, 0.1, 0.9, 0.3])
+            tab_ax.axis("off")
+            tab = tab_ax.table(
+                cellText=[[str(getattr(m, c)) for c in cols] for m in reversed(last)],
+                colLabels=cols,
+                loc="upper center",
+            )
+            tab.auto_set_font_size(False)
+            tab.set_fontsize(7)
+            tab_ax.set_title("Letzte Messungen", fontsize=10)
+        fig.text(
+            0.08, 0.03,
+            "Studienprototyp – nicht validierte Demo-Berechnung.",
+            fontsize=7, color="#777",
+        )
+        pdf.savefig(fig)
+        plt.close(fig)
+
+        # Seite 2: Parameterverläufe
+        fig, axes = plt.subplots(7, 2, figsize=(8.27, 11.69))
+        for ax, (key, label) in zip(axes.flat, TREND_PARAMS):
+            pts = _series(verlauf, key)
+            if pts:
+                ax.plot([p[0] for p in pts], [p[1] for p in pts], marker=".", color="#c0392b")
+            ax.set_title(label, fontsize=8)
+            ax.tick_params(labelsize=6)
+            ax.tick_params(axis="x", labelbottom=False)
+        fig.tight_layout()
+        pdf.savefig(fig)
+        plt.close(fig)
+    return buf.getvalue()
+
+
+_RENDERERS = {"html": _html_report, "pdf": _pdf_report}
+
+
+def build_patient_report(pat_id: str, patient: Patient, fmt: str = "html") -> bytes:
+    """Bericht für einen Patienten erzeugen oder aus dem Cache liefern."""
+    if fmt not in _RENDERERS:
+        raise ValueError(f"Unbekanntes Berichtsformat: {fmt}")
+
+    path = _cache_path(pat_id, report_key(pat_id, patient), fmt)
+    if path.exists():
+        return path.read_bytes()
+
+    data = _RENDERERS[fmt](pat_id, patient)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    _prune_old_reports(path)
+    return data
+
+
+def _build_worker(args):
+    pat_id, patient, fmt, partition = args
+    # Prozess-Pool: die Partition der Sitzung wird nicht vererbt
+    storage.use_partition(partition)
+    build_patient_report(pat_id, patient, fmt)
+    return pat_id
+
+
+def build_all_reports(patients: dict, fmt: str = "html", max_workers=None) -> dict:
+    """Berichte aller Patienten erzeugen, fehlende parallel im Prozess-Pool.
+
+    Gibt ein Dict ``{Patienten-ID: Bericht-Bytes}`` zurück. Unveränderte
+    Patienten werden direkt aus dem Cache gelesen.
+    """
+    reports = {}
+    missing = []
+    for pat_id, patient in patients.items():
+        path = _cache_path(pat_id, report_key(pat_id, patient), fmt)
+        if path.exists():
+            reports[pat_id] = path.read_bytes()
+        else:
+            missing.append((pat_id, patient, fmt, storage.current_partition()))
+
+    if len(missing) == 1:
+        _build_worker(missing[0])
+    elif missing:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(_build_worker, missing, chunksize=4))
+
+    for pat_id, patient, *_ in missing:
+        reports[pat_id] = _cache_path(pat_id, report_key(pat_id, patient), fmt).read_bytes()
+    return reports
+
+
+# ---------------------------------------------------------
+# Kohorten-Export
+# ---------------------------------------------------------
+def cohort_dataframe(patients: dict):
+    """Alle Messungen aller Patienten im Long-Format (eine Zeile pro Messung)."""
+    import pandas as pd
+
+    rows = []
+    for pat_id, patient in patients.items():
+        base = {
+            "patient_id": pat_id,
+            "name": patient.name,
+            "age": patient.age,
+            "diagnose": patient.diagnose,
+        }
+        for m in patient.verlauf:
+            row = {**base, **m.to_dict()}
+            for key, value in (row.pop("unsicherheit") or {}).items():
+                row[f"unsicherheit_{key}"] = value
+            rows.append(row)
+    df = pd.DataFrame(rows)
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    return df
+
+
+def export_cohort(patients: dict, fmt: str = "csv") -> bytes:
+    """Kohorte als CSV oder Parquet (benötigt pyarrow) exportieren."""
+    df = cohort_dataframe(patients)
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    if fmt == "parquet":
+        buf = io.BytesIO()
+        df.to_parquet(buf, index=False)
+        return buf.getvalue()
+    raise ValueError(f"Unbekanntes Exportformat: {fmt}")
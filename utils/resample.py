@@ -0,0 +1,149 @@
+"""Ausrichtung der unregelmäßigen Messverläufe auf ein festes Zeitraster.
+
+Alle Patienten werden gemeinsam (vektorisiert) verarbeitet:
+
+1. Doppelte Messungen (gleicher Patient, gleicher Zeitstempel) werden
+   entfernt, die zuletzt gespeicherte bleibt.
+2. Jede Messung wird dem nächsten Rasterpunkt *ab* ihrem Zeitpunkt
+   zugeordnet (``ceil``); mehrere Messungen in einem Intervall -> die letzte.
+   So verwendet ein Rasterpunkt nie Werte aus der Zukunft.
+3. Lücken werden per LOCF (letzter Wert fortgeschrieben) oder linear
+   aufgefüllt – höchstens ``max_gap`` nach der letzten echten Messung.
+   Danach bleiben die Werte leer und ``luecke`` ist gesetzt. Linear wird
+   nur zwischen Messungen interpoliert, die höchstens ``max_gap``
+   auseinanderliegen; in längeren Lücken wird wie bei LOCF fortgeschrieben,
+   damit kein Wert aus ferner Zukunft einfließt.
+
+Ergebnisse werden je Patient und Rasterkonfiguration zwischengespeichert
+(die zuletzt benutzten ``CACHE_MAX_ENTRIES``) und nur neu berechnet, wenn
+neue Messungen hinzugekommen sind.
+"""
+from collections import OrderedDict
+
+from utils.records import Measurement
+from utils.storage import current_partition
+
+PARAMS = [
+    name for name, f in Measurement.__dataclass_fields__.items() if f.type is float
+]
+METHODS = ("locf", "linear")
+
+# (Partition, Patienten-ID, Raster, Methode, max. Lücke)
+#   -> (Signatur des Verlaufs, DataFrame); älteste Einträge zuerst
+CACHE_MAX_ENTRIES = 2000
+_CACHE = OrderedDict()
+
+
+def _signature(patient) -> tuple:
+    verlauf = patient.verlauf
+    return (len(verlauf), verlauf[-1].timestamp if verlauf else "")
+
+
+def _measurements_frame(patients: dict):
+    import pandas as pd
+
+    rows = [
+        (pid, m.timestamp, *(getattr(m, p) for p in PARAMS))
+        for pid, patient in patients.items()
+        for m in patient.verlauf
+    ]
+    df = pd.DataFrame(rows, columns=["patient_id", "zeit_messung", *PARAMS])
+    df["zeit_messung"] = pd.to_datetime(df["zeit_messung"])
+    return df
+
+
+def _resample_all(patients: dict, freq: str, method: str, max_gap: str):
+    """Kernberechnung für mehrere Patienten in einem Durchlauf."""
+    import numpy as np
+    import pandas as pd
+
+    step = pd.Timedelta(freq)
+    gap_limit = pd.Timedelta(max_gap)
+
+    df = _measurements_frame(patients)
+    columns = ["patient_id", "timestamp", *PARAMS, "beobachtet", "alter_h", "luecke"]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    # 1. Duplikate entfernen
+    df = df.sort_values(["patient_id", "zeit_messung"], kind="stable")
+    df = df.drop_duplicates(["patient_id", "zeit_messung"], keep="last")
+
+    # 2. Rasterpunkte zuordnen, je Intervall die letzte Messung
+    df["timestamp"] = df["zeit_messung"].dt.ceil(step)
+    obs = df.groupby(["patient_id", "timestamp"], sort=True).last().reset_index()
+
+    # vollständiges Raster je Patient (erster bis letzter belegter Punkt)
+    bounds = obs.groupby("patient_id", sort=True)["timestamp"].agg(["min", "max"])
+    counts = ((bounds["max"] - bounds["min"]) // step).astype(np.int64) + 1
+    starts = np.repeat(bounds["min"].to_numpy(), counts.to_numpy())
+    offsets = np.arange(counts.sum()) - np.repeat(counts.cumsum().to_numpy() - counts.to_numpy(), counts.to_numpy())
+    grid = pd.DataFrame({
+        "patient_id": np.repeat(bounds.index.to_numpy(), counts.to_numpy()),
+        "timestamp": starts + offsets * step,
+    })
+    out = grid.merge(obs, on=["patient_id", "timestamp"], how="left")
+
+    # 3. Auffüllen. Jeder Patientenblock beginnt und endet mit einem belegten
+    # Rasterpunkt, daher kann global (ohne groupby) gefüllt werden, ohne
+    # Werte zwischen Patienten zu übertragen.
+    out["beobachtet"] = out["zeit_messung"].notna()
+    last_seen = out["zeit_messung"].ffill()
+    out["alter_h"] = (out["timestamp"] - last_seen) / pd.Timedelta("1h")
+    too_old = (out["timestamp"] - last_seen) > gap_limit
+
+    held = out[PARAMS].ffill()
+    if method == "locf":
+        out[PARAMS] = held
+    else:
+        next_seen = out["zeit_messung"].bfill()
+        long_gap = (next_seen - last_seen) > gap_limit
+        out[PARAMS] = out[PARAMS].interpolate(limit_area="inside").where(~long_gap, held)
+    out.loc[too_old, PARAMS] = np.nan
+    out["luecke"] = too_old
+
+    return out[columns]
+
+
+def resample(patients: dict, freq: str = "1h", method: str = "locf", max_gap: str = "6h"):
+    """Verläufe aller ``patients`` auf das Raster ``freq`` ausrichten.
+
+    Gibt ein DataFrame im Long-Format zurück (eine Zeile pro Patient und
+    Rasterpunkt) mit den Messparametern sowie ``beobachtet`` (echte Messung
+    im Intervall), ``alter_h`` (Stunden seit der letzten Messung) und
+    ``luecke`` (länger als ``max_gap`` ohne Messung).
+    """
+    import pandas as pd
+
+    if method not in METHODS:
+        raise ValueError(f"Unbekannte Methode: {method}")
+
+    partition = current_partition()
+    frames, stale = [], {}
+    for pid, patient in patients.items():
+        if not patient.verlauf:
+            continue
+        key = (partition, pid, freq, method, max_gap)
+        cached = _CACHE.get(key)
+        if cached is not None and cached[0] == _signature(patient):
+            _CACHE.move_to_end(key)
+            frames.append(cached[1])
+        else:
+            stale[pid] = patient
+
+    if stale:
+        fresh = _resample_all(stale, freq, method, max_gap)
+        for pid, part in fresh.groupby("patient_id", sort=False):
+            part = part.reset_index(drop=True)
+            key = (partition, pid, freq, method, max_gap)
+            _CACHE[key] = (_signature(stale[pid]), part)
+            _CACHE.move_to_end(key)
+            frames.append(part)
+        while len(_CACHE) > CACHE_MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+
+    if not frames:
+        return _resample_all({}, freq, method, max_gap)
+    return pd.concat(frames, ignore_index=True).sort_values(
+        ["patient_id", "timestamp"], kind="stable", ignore_index=True
+    )
@@ -0,0 +1,161 @@
+# ---------------------------------------------------------
+# Demo-Berechnungsmodell
+# (vereinfachte Gewichtung, ECMO-Flow & vitale Parameter stärker gewichtet)
+# ---------------------------------------------------------
+def calc_weaning_score(
+    map_mmHg,
+    hr,
+    vasopressor,
+    ecmo_flow,
+    sweep,
+    ecmo_fio2,
+    vent_fio2,
+    peep,
+    dp,
+    lactate,
+    ph,
+    pao2,
+    organ,
+    echo,
+):
+    # alles auf 0..1 Risiko normieren (0 = gut, 1 = schlecht)
+    def clamp01(x): 
+        return max(0.0, min(1.0, x))
+
+    # Hämodynamik
+    if map_mmHg < 55:
+        map_risk = 1.0
+    elif map_mmHg < 65:
+        map_risk = 0.7
+    elif map_mmHg <= 85:
+        map_risk = 0.2
+    else:
+        map_risk = 0.5
+
+    if hr < 50 or hr > 130:
+        hr_risk = 1.0
+    elif 50 <= hr <= 110:
+        hr_risk = 0.3
+    else:
+        hr_risk = 0.6
+
+    vaso_risk = clamp01(vasopressor / 10.0)
+
+    # Oxygenierung / Ventilation
+    if pao2 < 60:
+        pao2_risk = 0.9
+    elif pao2 < 80:
+        pao2_risk = 0.5
+    else:
+        pao2_risk = 0.2
+
+    if lactate > 4:
+        lactate_risk = 1.0
+    elif lactate > 2:
+        lactate_risk = 0.6
+    else:
+        lactate_risk = 0.2
+
+    if ph < 7.2 or ph > 7.5:
+        ph_risk = 0.9
+    elif 7.3 <= ph <= 7.45:
+        ph_risk = 0.2
+    else:
+        ph_risk = 0.5
+
+    # ECMO-Parameter – Flow besonders wichtig
+    if ecmo_flow < 2.0:
+        flow_risk = 1.0
+    elif ecmo_flow < 3.0:
+        flow_risk = 0.6
+    else:
+        flow_risk = 0.2
+
+    sweep_risk = clamp01((sweep - 1.0) / 4.0)  # höherer Sweep = eher schlechter
+    ecmo_fio2_risk = clamp01((ecmo_fio2 - 0.5) / 0.5)
+    vent_fio2_risk = clamp01((vent_fio2 - 0.4) / 0.6)
+    peep_risk = clamp01(abs(peep - 10) / 10.0)
+    dp_risk = clamp01((dp - 12) / 10.0)
+
+    # Organfunktion / Echo (0 = schlecht, 10 = gut)
+    organ_risk = clamp01((10 - organ) / 10.0)
+    echo_risk = clamp01((10 - echo) / 10.0)
+
+    # Gewichtung der Bereiche
+    vitals = (map_risk + hr_risk + vaso_risk + pao2_risk + lactate_risk + ph_risk) / 6
+    ecmo = (flow_risk * 2 + sweep_risk + ecmo_fio2_risk + vent_fio2_risk + peep_risk + dp_risk) / 7
+    organs = (organ_risk + echo_risk) / 2
+
+    # Flow stärker gewichtet -> ECMO-Teil insgesamt stärker
+    total_risk = 0.4 * ecmo + 0.35 * vitals + 0.25 * organs
+    total_risk = clamp01(total_risk)
+
+    success_prob = round((1 - total_risk) * 100, 1)
+    failure_prob = round(100 - success_prob, 1)
+
+    # Ampel-Einteilung
+    if success_prob >= 75:
+        level = "green"
+        text = "🟢 Günstiges Weaning-Szenario (Demo)"
+    elif success_prob >= 50:
+        level = "yellow"
+        text = "🟡 Grenzbereich – engmaschig beobachten (Demo)"
+    else:
+        level = "red"
+        text = "🔴 Ungünstiges Weaning-Szenario (Demo)"
+
+    return success_prob, failure_prob, level, text
+
+
+# ---------------------------------------------------------
+# Vektorisierte Variante für viele Eingaben auf einmal
+# (identische Schwellen/Gewichte wie calc_weaning_score)
+# ---------------------------------------------------------
+LEVELS = ("green", "yellow", "red")
+
+
+def calc_weaning_score_batch(p: dict):
+    """Erfolgswahrscheinlichkeiten für Arrays von Eingaben berechnen.
+
+    ``p`` enthält je Parameter (Schlüssel wie in ``Measurement``: ``MAP``,
+    ``HR``, ``Vasopressor`` ...) ein NumPy-Array gleicher Länge. Gibt
+    ``(success_prob, level_index)`` zurück; ``level_index`` verweist auf ``LEVELS``.
+    """
+    import numpy as np
+
+    def clamp01(x):
+        return np.clip(x, 0.0, 1.0)
+
+    map_mmHg, hr, lactate, ph, pao2 = p["MAP"], p["HR"], p["Laktat"], p["pH"], p["PaO2"]
+    ecmo_flow = p["ECMO_Flow"]
+
+    # Hämodynamik
+    map_risk = np.select([map_mmHg < 55, map_mmHg < 65, map_mmHg <= 85], [1.0, 0.7, 0.2], 0.5)
+    hr_risk = np.select([(hr < 50) | (hr > 130), hr <= 110], [1.0, 0.3], 0.6)
+    vaso_risk = clamp01(p["Vasopressor"] / 10.0)
+
+    # Oxygenierung / Ventilation
+    pao2_risk = np.select([pao2 < 60, pao2 < 80], [0.9, 0.5], 0.2)
+    lactate_risk = np.select([lactate > 4, lactate > 2], [1.0, 0.6], 0.2)
+    ph_risk = np.select([(ph < 7.2) | (ph > 7.5), (ph >= 7.3) & (ph <= 7.45)], [0.9, 0.2], 0.5)
+
+    # ECMO-Parameter – Flow besonders wichtig
+    flow_risk = np.select([ecmo_flow < 2.0, ecmo_flow < 3.0], [1.0, 0.6], 0.2)
+    sweep_risk = clamp01((p["Sweep"] - 1.0) / 4.0)
+    ecmo_fio2_risk = clamp01((p["ECMO_FiO2"] - 0.5) / 0.5)
+    vent_fio2_risk = clamp01((p["Vent_FiO2"] - 0.4) / 0.6)
+    peep_risk = clamp01(np.abs(p["PEEP"] - 10) / 10.0)
+    dp_risk = clamp01((p["DP"] - 12) / 10.0)
+
+    # Organfunktion / Echo (0 = schlecht, 10 = gut)
+    organ_risk = clamp01((10 - p["Organ"]) / 10.0)
+    echo_risk = clamp01((10 - p["Echo"]) / 10.0)
+
+    vitals = (map_risk + hr_risk + vaso_risk + pao2_risk + lactate_risk + ph_risk) / 6
+    ecmo = (flow_risk * 2 + sweep_risk + ecmo_fio2_risk + vent_fio2_risk + peep_risk + dp_risk) / 7
+    organs = (organ_risk + echo_risk) / 2
+
+    total_risk = clamp01(0.4 * ecmo + 0.35 * vitals + 0.25 * organs)
+    success_prob = np.round((1 - total_risk) * 100, 1)
+    level_index = np.select([success_prob >= 75, success_prob >= 50], [0, 1], 2)
+    return success_prob, level_index
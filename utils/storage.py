@@ -0,0 +1,117 @@
+import json
+import os
+import re
+import unicodedata
+from contextvars import ContextVar
+from pathlib import Path
+
+from utils.records import Patient, StudyCase, ValidationError
+
+# ---------------------------------------------------------
+# Speicherorte
+# ---------------------------------------------------------
+# Ohne Zentrum (nicht angemeldet) wird direkt in ``data/`` gespeichert,
+# sonst in einer eigenen Partition ``data/zentren/<zentrum>/``.
+DATA_DIR = Path("data")
+PARTITION_DIR = "zentren"
+PATIENT_FILE = "patients.json"
+STUDY_FILE = "study_30cerw_cases.json"
+
+# Aktive Partition der laufenden Sitzung. Streamlit führt jede Sitzung in
+# einem eigenen Thread aus, daher bleibt die Auswahl je Sitzung getrennt.
+_partition: ContextVar = ContextVar("partition", default=None)
+
+
+_UMLAUTE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def partition_key(center: str) -> str:
+    """Dateisystem-tauglicher Name einer Zentrumspartition."""
+    name = unicodedata.normalize("NFKD", center.strip().lower().translate(_UMLAUTE))
+    key = re.sub(r"[^a-z0-9]+", "-", name.encode("ascii", "ignore").decode()).strip("-")
+    if not key:
+        raise ValueError(f"Ungültiger Zentrumsname: {center!r}")
+    return key
+
+
+def use_partition(center):
+    """Partition für alle folgenden Lese-/Schreibzugriffe dieses Threads wählen.
+
+    ``None`` oder ``""`` wählt die gemeinsame Standardpartition ``data/``.
+    """
+    _partition.set(partition_key(center) if center else None)
+
+
+def current_partition():
+    return _partition.get()
+
+
+def data_dir() -> Path:
+    key = _partition.get()
+    return DATA_DIR if key is None else DATA_DIR / PARTITION_DIR / key
+
+
+def list_partitions() -> list:
+    """Alle vorhandenen Partitionen; ``None`` steht für die Standardpartition."""
+    root = DATA_DIR / PARTITION_DIR
+    centers = sorted(p.name for p in root.iterdir() if p.is_dir()) if root.exists() else []
+    return [None] + centers
+
+
+class StorageError(Exception):
+    """Eine Datendatei ist beschädigt oder entspricht nicht dem Schema."""
+
+
+def _read_json(path: Path):
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except json.JSONDecodeError as e:
+        raise StorageError(f"{path} ist keine gültige JSON-Datei: {e}") from e
+    if not isinstance(data, dict):
+        raise StorageError(f"{path}: Objekt auf oberster Ebene erwartet")
+    return data
+
+
+def _write_json(path: Path, data: dict):
+    """Atomar schreiben, damit ein Abbruch keine halbe Datei hinterlässt."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    os.replace(tmp, path)
+
+
+def _decode(cls, raw: dict, path: Path) -> dict:
+    try:
+        return {key: cls.from_dict(value, key) for key, value in raw.items()}
+    except ValidationError as e:
+        raise StorageError(f"{path}: {e}") from e
+
+
+# ---------------------------------------------------------
+# Patienten
+# ---------------------------------------------------------
+def load_patients() -> dict[str, Patient]:
+    """Alle Patienten laden (Schlüssel = Patienten-ID)."""
+    path = data_dir() / PATIENT_FILE
+    return _decode(Patient, _read_json(path), path)
+
+
+def save_patients(patients: dict[str, Patient]):
+    _write_json(data_dir() / PATIENT_FILE, {pid: p.to_dict() for pid, p in patients.items()})
+
+
+# ---------------------------------------------------------
+# 30CERW-Studienfälle
+# ---------------------------------------------------------
+def load_cases() -> dict[str, StudyCase]:
+    """Alle 30CERW-Fälle laden (Schlüssel = Studien-ID)."""
+    path = data_dir() / STUDY_FILE
+    return _decode(StudyCase, _read_json(path), path)
+
+
+def save_cases(cases: dict[str, StudyCase]):
+    _write_json(data_dir() / STUDY_FILE, {sid: c.to_dict() for sid, c in cases.items()})
@@ -0,0 +1,81 @@
+"""Monte-Carlo-Unsicherheitsbereich für die Weaning-Wahrscheinlichkeit.
+
+Die Eingaben werden gemäß je Parameter konfigurierbarer Fehlermodelle
+gestört und alle Ziehungen in einem vektorisierten Durchlauf von
+``calc_weaning_score_batch`` ausgewertet.
+
+Fehlermodell je Parameter (``data/uncertainty_models.json`` überschreibt
+einzelne Einträge aus ``DEFAULT_MODELS``):
+
+    {"typ": "abs", "sd": 3.0, "min": 0, "max": 10}   # absolute SD
+    {"typ": "rel", "sd": 0.08}                        # SD relativ zum Messwert
+"""
+import json
+
+from utils.scoring import LEVELS, calc_weaning_score_batch
+from utils.storage import DATA_DIR
+
+MODELS_FILE = DATA_DIR / "uncertainty_models.json"
+DEFAULT_DRAWS = 5000
+
+DEFAULT_MODELS = {
+    "MAP": {"typ": "abs", "sd": 3.0, "min": 0.0},
+    "HR": {"typ": "abs", "sd": 3.0, "min": 0.0},
+    "Vasopressor": {"typ": "abs", "sd": 0.5, "min": 0.0, "max": 10.0},
+    "ECMO_Flow": {"typ": "rel", "sd": 0.05, "min": 0.0},
+    "Sweep": {"typ": "abs", "sd": 0.1, "min": 0.0},
+    "ECMO_FiO2": {"typ": "abs", "sd": 0.02, "min": 0.21, "max": 1.0},
+    "Vent_FiO2": {"typ": "abs", "sd": 0.02, "min": 0.21, "max": 1.0},
+    "PEEP": {"typ": "abs", "sd": 0.5, "min": 0.0},
+    "DP": {"typ": "abs", "sd": 1.0, "min": 0.0},
+    "Laktat": {"typ": "rel", "sd": 0.08, "min": 0.0},
+    "pH": {"typ": "abs", "sd": 0.02},
+    "PaO2": {"typ": "rel", "sd": 0.08, "min": 0.0},
+    "Organ": {"typ": "abs", "sd": 1.0, "min": 0.0, "max": 10.0},
+    "Echo": {"typ": "abs", "sd": 1.0, "min": 0.0, "max": 10.0},
+}
+
+
+def load_models() -> dict:
+    """Fehlermodelle (Standard, ergänzt um ``uncertainty_models.json``)."""
+    models = {k: dict(v) for k, v in DEFAULT_MODELS.items()}
+    if MODELS_FILE.exists():
+        with open(MODELS_FILE, "r", encoding="utf-8") as f:
+            for param, model in json.load(f).items():
+                if param not in models:
+                    raise ValueError(f"Unbekannter Parameter im Fehlermodell: {param}")
+                models[param] = model
+    return models
+
+
+def monte_carlo(values: dict, n: int = DEFAULT_DRAWS, models=None, seed=None) -> dict:
+    """Unsicherheit der Erfolgswahrscheinlichkeit schätzen.
+
+    ``values`` enthält die Messwerte (Schlüssel wie in ``Measurement``).
+    Liefert Median, 95 %-Intervall und die Wahrscheinlichkeit jeder
+    Ampelkategorie – gerundet, so wie sie mit der Messung gespeichert werden.
+    """
+    import numpy as np
+
+    models = load_models() if models is None else models
+    rng = np.random.default_rng(seed)
+
+    draws = {}
+    for param, model in models.items():
+        value = float(values[param])
+        sd = model["sd"] * abs(value) if model["typ"] == "rel" else model["sd"]
+        x = rng.normal(value, sd, n) if sd > 0 else np.full(n, value)
+        if "min" in model or "max" in model:
+            x = np.clip(x, model.get("min", -np.inf), model.get("max", np.inf))
+        draws[param] = x
+
+    success, level = calc_weaning_score_batch(draws)
+    low, median, high = np.percentile(success, [2.5, 50, 97.5])
+    counts = np.bincount(level, minlength=len(LEVELS)) / n
+    return {
+        "n": float(n),
+        "median": round(float(median), 1),
+        "ci_low": round(float(low), 1),
+        "ci_high": round(float(high), 1),
+        **{f"p_{name}": round(float(p), 3) for name, p in zip(LEVELS, counts)},
+    }
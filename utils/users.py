@@ -0,0 +1,68 @@
+"""Benutzerkonten (``data/user.json``).
+
+Ein Eintrag ist ``{"passwort", "zentrum", "rolle"}``; ältere Einträge
+bestehen nur aus dem Passwort. Zentrum und Rolle bestimmen, welche
+Datenpartition eine Sitzung sieht, und werden deshalb nie direkt aus der
+Registrierung übernommen: Ein gewünschtes Zentrum wird als
+``zentrum_beantragt`` vorgemerkt und erst durch einen Administrator
+freigegeben. Die Rolle ``admin`` wird direkt in ``user.json`` eingetragen.
+"""
+import json
+import os
+
+from utils.storage import DATA_DIR, partition_key
+
+USER_FILE = DATA_DIR / "user.json"
+
+
+def load_users() -> dict:
+    if not USER_FILE.exists():
+        return {}
+    with open(USER_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_users(users: dict):
+    USER_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = USER_FILE.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(users, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, USER_FILE)
+
+
+def user_entry(users: dict, name: str):
+    """Nutzereintrag als Dict (``None``, falls unbekannt)."""
+    entry = users.get(name)
+    if isinstance(entry, str):
+        return {"passwort": entry, "zentrum": "", "rolle": "nutzer"}
+    return entry
+
+
+def register(users: dict, name: str, password: str, center: str = ""):
+    """Neuen Nutzer ohne Zentrum anlegen; ``center`` wird nur beantragt."""
+    if center.strip():
+        partition_key(center)  # ValueError bei unbrauchbarem Namen
+    users[name] = {
+        "passwort": password,
+        "zentrum": "",
+        "zentrum_beantragt": center.strip(),
+        "rolle": "nutzer",
+    }
+
+
+def pending(users: dict) -> dict:
+    """Offene Zentrumsanträge ``{Nutzer: beantragtes Zentrum}``."""
+    return {
+        name: entry["zentrum_beantragt"]
+        for name, entry in users.items()
+        if isinstance(entry, dict) and entry.get("zentrum_beantragt")
+    }
+
+
+def decide(users: dict, name: str, approve: bool):
+    """Zentrumsantrag eines Nutzers freigeben oder ablehnen."""
+    entry = user_entry(users, name)
+    if approve:
+        entry["zentrum"] = entry["zentrum_beantragt"]
+    entry["zentrum_beantragt"] = ""
+    users[name] = entry